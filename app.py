@@ -1,5 +1,4 @@
 import gradio as gr
-from datetime import datetime
 
 from src.ui import sidebar_ui, dashboard_ui
 from src.ui.session import session_state
@@ -12,13 +11,9 @@ custom_theme = gr.themes.Base(
 )
 
 STATE = {
-    "running": False,
-    "date": datetime.now(),
-    "part_id": 0,
+    "session": None,    # handle of the session data, see src.ui.session.SessionRegistry
     "cycle": 0,
     "chat": [],
-    "status": {},
-    "data": {},
 }
 
 with gr.Blocks(theme=custom_theme) as demo:
@@ -0,0 +1,120 @@
+"""
+Per-tick latency of the tool statistics against the number of tools.
+
+    python -m benchmarks.tools_metrics --tools 2 8 32 128 --rows 1000 10000
+
+- threads: the former tools_metrics, one ThreadPoolExecutor per call and one copied slice per tool,
+  recomputed over the whole window;
+- streaming: ToolsCapability as used by the dashboard, one new second of parts folded in, then the charts' frames.
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.production.flow import SimulationConfig
+from src.production.metrics.tools import ToolsCapability
+from src.production.schema import merge_blocks, to_frame
+from src.production.specs import CHARACTERISTICS, registry
+
+START = datetime(2025, 1, 1)
+
+
+def expanding_stats(data, column, usl, lsl):
+    rolling_mean = data[column].expanding().mean()
+    rolling_std = data[column].expanding().std()
+    cp = (usl - lsl) / (6 * rolling_std)
+    cpk = np.minimum((usl - rolling_mean) / (3 * rolling_std), (rolling_mean - lsl) / (3 * rolling_std))
+    cpk[rolling_std == 0] = 0
+    return rolling_mean, rolling_std, cp, cpk
+
+
+def add_expanding_stats(data):
+    """One column at a time, with the product limits, as tools_metrics did before the grouped computation."""
+    for name, (prefix, column) in CHARACTERISTICS.items():
+        lsl, usl = registry.spec()[name]
+        (
+            data[f"{prefix}_rolling_mean"], data[f"{prefix}_rolling_std"],
+            data[f"{prefix}_rolling_cp"], data[f"{prefix}_rolling_cpk"],
+        ) = expanding_stats(data, column, usl, lsl)
+    return data
+
+
+async def threaded_tools_metrics(raw_data):
+    """tools_metrics before the grouped computation, kept as the baseline."""
+    parts = raw_data[raw_data['Tool ID'].notna()]
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor() as executor:
+        results = await asyncio.gather(*[
+            loop.run_in_executor(executor, add_expanding_stats, parts[parts['Tool ID'] == tool].copy())
+            for tool in parts['Tool ID'].unique()
+        ])
+    metrics = {f"tool_{data['Tool ID'].iloc[0]}": data for data in results}
+    metrics['all'] = add_expanding_stats(parts.copy())
+    return metrics
+
+
+def simulate(tools, rows, ticks):
+    """
+    Blocks of a seeded fleet with `tools` tools, one per simulated second: at least `rows` rows of
+    window, then one new block for each of `ticks` ticks.
+    """
+    config = SimulationConfig(machines_count=max(tools // 2, 1), tools_per_machine=min(tools, 2), seed=0, start=START)
+    simulators = config.simulators()
+    blocks, produced, second = [], 0, 0
+    while produced < rows:
+        second += 1
+        block = merge_blocks([simulator.advance(START + timedelta(seconds=second)) for simulator in simulators])
+        blocks.append(block)
+        produced += len(block["timestamp"])
+    new_blocks = [
+        merge_blocks([simulator.advance(START + timedelta(seconds=second + tick)) for simulator in simulators])
+        for tick in range(1, ticks + 1)
+    ]
+    return config.tools_count, blocks, new_blocks
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return np.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-tick latency of the tool statistics against the number of tools.")
+    parser.add_argument("--tools", type=int, nargs="+", default=[2, 8, 32, 128])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10_000], help="rows of the window")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    print(f"{'tools':>6} {'rows':>7} {'threads ms':>11} {'streaming ms':>13}")
+    for tools in args.tools:
+        for rows in args.rows:
+            tools_count, blocks, new_blocks = simulate(tools, rows, args.repeat)
+            window = to_frame(merge_blocks(blocks), tools_count)
+
+            threads = timed(lambda: loop.run_until_complete(threaded_tools_metrics(window)), args.repeat)
+
+            capability = ToolsCapability()
+            for block in blocks:
+                capability.update(block)
+            ticks = iter(new_blocks)
+
+            def tick():
+                capability.update(next(ticks))      # a new second of the stream on every tick
+                capability.frames(rows)
+            streaming = timed(tick, args.repeat)
+
+            print(f"{tools_count:>6} {len(window):>7} {threads:>11.2f} {streaming:>13.2f}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ from src.agent.tools import (
     visit_webpage,
     get_production_status,
     get_downtimes,
+    get_spc_violations,
+    get_production_history,
 )
 
 load_dotenv()
@@ -26,6 +28,8 @@ class MistralAgent:
             "visit_webpage": visit_webpage,
             "get_production_status": get_production_status,
             "get_downtimes": get_downtimes,
+            "get_spc_violations": get_spc_violations,
+            "get_production_history": get_production_history,
         }
         self.tools = self.get_tools()
 
@@ -39,5 +43,7 @@ class MistralAgent:
                 visit_webpage,
                 get_production_status,
                 get_downtimes,
+                get_spc_violations,
+                get_production_history,
             ]
         ).get('tools')
\ No newline at end of file
@@ -2,4 +2,6 @@ from .calculator import calculate_sum
 from .retrieve_knowledge import retrieve_knowledge
 from .visit_webpage import visit_webpage
 from .check_production import get_production_status
-from .check_downtines import get_downtimes
\ No newline at end of file
+from .check_downtines import get_downtimes
+from .check_spc import get_spc_violations
+from .check_history import get_production_history
\ No newline at end of file
@@ -4,7 +4,7 @@ from src.agent.utils.tooling import tool
 @tool
 def get_downtimes() -> str:
     """
-    This tool provide the production downtimes which is useful for understanding production issues and causes. Data contains information about downtimes including their description, duration and causes.
+    This tool provide the production downtimes which is useful for understanding production issues and causes. Data contains the count, cumulative downtime and MTTR of each error code since the start, and the latest downtimes with their description, duration and causes.
     """
     try:
         with open("data/downtimes.json", "r") as f:
@@ -12,7 +12,7 @@ def get_downtimes() -> str:
 
         data = json.loads(json_string)
 
-        if data is None or len(data) == 0 or data == "[]":
+        if data is None or len(data) == 0 or not data.get("latest"):
             result = "'No downtimes recorded yet. Please check the production status or wait for downtimes to occur.'"
         else:
             result = "##### Downtimes:\n\n"
@@ -0,0 +1,25 @@
+import json
+from src.agent.utils.tooling import tool
+
+@tool
+def get_production_history() -> str:
+    """
+    This tool provides the production metrics over the last hour, the last shift (8 hours) and the last day: opening time, unplanned stops, quality rates, availability, OEE, and the mean, std, Cp and Cpk of the position and orientation per tool and for all tools. Useful for comparing the current production with the recent past and answering questions about a shift or a day.
+    """
+    try:
+        with open("data/history.json", "r") as f:
+            json_string = f.read()
+
+        data = json.loads(json_string)
+
+        if data == {}:
+            result = "'Production has not started yet.'"
+        else:
+            result = "##### Production history:\n\n"
+            result += json_string
+
+        return result
+
+    except Exception as e:
+        print(f"Error getting production history: {e}")
+        return None
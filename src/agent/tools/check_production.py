@@ -4,7 +4,7 @@ from src.agent.utils.tooling import tool
 @tool
 def get_production_status() -> str:
     """
-    This tool retrieves the current production status including various metrics such as operating time, unplanned stops, quality rates, availability, and performance indicators. Useful for understanding the overall production health and efficiency.
+    This tool retrieves the current production status including various metrics such as operating time, unplanned stops, quality rates, availability, and performance indicators. Cp/Cpk are given per tool since the start (e.g. tool_1_cpk_pos), over the last parts (_window suffix), the last minutes (_recent suffix) and exponentially weighted (_ewma suffix), the latter showing recent drifts. Useful for understanding the overall production health and efficiency.
     """
     try:
         with open("data/status.json", "r") as f:
@@ -0,0 +1,25 @@
+import json
+from src.agent.utils.tooling import tool
+
+@tool
+def get_spc_violations() -> str:
+    """
+    This tool provides the latest statistical process control violations, detected with the Nelson rules on the position and orientation of each tool (points beyond 3 sigma, runs on one side of the center line, trends, alternations...). Useful for spotting drifts and unstable processes before parts go out of tolerance. Each violation gives the part, tool, characteristic, rule number and description.
+    """
+    try:
+        with open("data/violations.json", "r") as f:
+            json_string = f.read()
+
+        data = json.loads(json_string)
+
+        if data is None or len(data) == 0:
+            result = "'No SPC violations detected yet. The processes are under statistical control.'"
+        else:
+            result = "##### SPC violations (newest first):\n\n"
+            result += json_string
+
+        return result
+
+    except Exception as e:
+        print(f"Error getting SPC violations: {e}")
+        return None
@@ -0,0 +1,77 @@
+import numpy as np
+
+from .schema import FIELDS, to_frame
+
+DEFAULT_CAPACITY = 10_000
+
+
+class TelemetryBuffer:
+    """
+    Fixed-capacity ring buffer of typed telemetry columns.
+    Every row is written twice, at `i` and `i + capacity`, so the latest rows are always
+    a contiguous slice of each column and can be returned as views without copying.
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY, tools_count=2):
+        self.capacity = capacity
+        self.tools_count = tools_count
+        self.columns = {name: np.zeros(2 * capacity, dtype=dtype) for name, dtype in FIELDS.items()}
+        self.head = 0           # next write position in [0, capacity)
+        self.total = 0          # rows appended since creation, i.e. the data version
+        self.stream_rows = np.zeros(tools_count + 1, dtype=np.int64)    # per tool ID, 0 for machine errors
+        self.listeners = []     # callables receiving every appended block, e.g. running metrics
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, block):
+        """
+        Append a block of rows given as a dict of equally sized arrays keyed like FIELDS.
+        Costs O(len(block)), whatever the number of rows already stored.
+        """
+        size = len(block["timestamp"])
+        if size == 0:
+            return
+        skipped = max(size - self.capacity, 0)
+        positions = (self.head + skipped + np.arange(size - skipped)) % self.capacity
+        for name, column in self.columns.items():
+            values = np.asarray(block[name])[skipped:]
+            column[positions] = values
+            column[positions + self.capacity] = values
+        self.head = (self.head + size) % self.capacity
+        self.total += size
+        rows = np.bincount(np.asarray(block["tool_id"], dtype=np.int64), minlength=len(self.stream_rows))
+        if len(rows) > len(self.stream_rows):
+            self.stream_rows = np.append(self.stream_rows, np.zeros(len(rows) - len(self.stream_rows), dtype=np.int64))
+        self.stream_rows += rows
+        for listener in self.listeners:
+            listener(block)
+
+    def version(self, stream=None):
+        """
+        Monotonic data version: rows appended since creation, overall or for one stream
+        (a tool ID, or 0 for the machine errors). Comparing versions tells in O(1) whether anything changed.
+        """
+        if stream is None:
+            return self.total
+        return int(self.stream_rows[stream]) if stream < len(self.stream_rows) else 0
+
+    def since(self, version):
+        """
+        Zero-copy views of the rows appended after the overall `version`, oldest first,
+        as far as they are still in the buffer.
+        """
+        return self.latest(self.total - version)
+
+    def latest(self, n=None):
+        """
+        Zero-copy views of the latest `n` rows (all stored rows by default), oldest first.
+        """
+        n = len(self) if n is None else min(n, len(self))
+        end = self.head + self.capacity
+        return {name: column[end - n:end] for name, column in self.columns.items()}
+
+    def to_frame(self, n=None):
+        """
+        Latest `n` rows as a typed telemetry DataFrame (see schema.to_frame).
+        """
+        return to_frame(self.latest(n), self.tools_count)
@@ -1,64 +1,100 @@
 from datetime import timedelta
 
+# "downtime": time to repair, "mtbf": mean operating time between two occurrences of the error
 machine_errors = {
     "E001": {
         "description": "Calibration Error",
         "cause": "The machine is not correctly calibrated.",
         "solution": "Recalibrate the machine according to the manufacturer's specifications.",
-        "downtime": timedelta(minutes=15)
+        "downtime": timedelta(minutes=15),
+        "mtbf": timedelta(minutes=20)
     },
     "E002": {
         "description": "Motor Overheating",
         "cause": "The motor has exceeded the maximum operating temperature.",
         "solution": "Stop the machine and let it cool down. Check the cooling system.",
-        "downtime": timedelta(minutes=20)
+        "downtime": timedelta(minutes=20),
+        "mtbf": timedelta(minutes=25)
     },
     "E003": {
         "description": "Material Jam",
         "cause": "Accumulation of material in the processing area.",
         "solution": "Clean the processing area and check the feeding mechanisms.",
-        "downtime": timedelta(minutes=8)
+        "downtime": timedelta(minutes=8),
+        "mtbf": timedelta(minutes=10)
     },
     "E004": {
         "description": "Sensor Error",
         "cause": "A sensor is not functioning correctly.",
         "solution": "Check the sensor connections and replace if necessary.",
-        "downtime": timedelta(minutes=20)
+        "downtime": timedelta(minutes=20),
+        "mtbf": timedelta(minutes=20)
     },
     "E005": {
         "description": "Power Failure",
         "cause": "Electrical supply interrupted.",
         "solution": "Check the electrical supply and fuses. Restart the machine.",
-        "downtime": timedelta(minutes=10)
+        "downtime": timedelta(minutes=10),
+        "mtbf": timedelta(minutes=30)
     },
     "E006": {
         "description": "Software Error",
         "cause": "Bug in the machine control software.",
         "solution": "Restart the software or update the firmware.",
-        "downtime": timedelta(minutes=15)
+        "downtime": timedelta(minutes=15),
+        "mtbf": timedelta(minutes=15)
     },
     "E007": {
         "description": "Wear and Tear of Parts",
         "cause": "The machine parts are worn out.",
         "solution": "Inspect the parts and replace if necessary.",
-        "downtime": timedelta(minutes=15)
+        "downtime": timedelta(minutes=15),
+        "mtbf": timedelta(minutes=20)
     },
     "E008": {
         "description": "Communication Error",
         "cause": "Communication problem between different machine modules.",
         "solution": "Check communication cables and protocols.",
-        "downtime": timedelta(minutes=20)
+        "downtime": timedelta(minutes=20),
+        "mtbf": timedelta(minutes=25)
     },
     "E009": {
         "description": "Low Lubricant Level",
         "cause": "The lubricant level is insufficient.",
         "solution": "Refill the lubricant reservoir according to specifications.",
-        "downtime": timedelta(minutes=8)
+        "downtime": timedelta(minutes=8),
+        "mtbf": timedelta(minutes=12)
     },
     "E010": {
         "description": "Positioning Error",
         "cause": "The tooling is not positioning correctly.",
         "solution": "Check the positioning mechanisms and recalibrate if necessary.",
-        "downtime": timedelta(minutes=15)
+        "downtime": timedelta(minutes=15),
+        "mtbf": timedelta(minutes=15)
     }
-}
\ No newline at end of file
+}
+
+# Station error profiles: failure rates of a station relative to the catalog MTBF.
+# "rate_factor" scales every code, "weights" scales single codes (1 when omitted).
+error_profiles = {
+    "standard": {
+        "description": "Station in nominal condition.",
+        "rate_factor": 1.0,
+        "weights": {}
+    },
+    "worn": {
+        "description": "Ageing station where mechanical failures dominate.",
+        "rate_factor": 1.0,
+        "weights": {"E002": 2, "E003": 2, "E007": 3, "E009": 2, "E010": 1.5}
+    },
+    "electrical": {
+        "description": "Station with an unstable power supply and noisy sensors.",
+        "rate_factor": 1.0,
+        "weights": {"E004": 2, "E005": 3, "E006": 1.5, "E008": 2}
+    },
+    "calibrated": {
+        "description": "Recently serviced station, errors are rare.",
+        "rate_factor": 0.5,
+        "weights": {"E001": 2}
+    }
+}
@@ -0,0 +1,69 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .flow import SimulationConfig
+from .schema import merge_blocks
+
+
+def advance_shard(simulators, until):
+    """
+    Advance a shard of machine simulators in a worker process.
+    The simulators are sent back with the block since the worker only works on copies.
+    """
+    block = merge_blocks([simulator.advance(until) for simulator in simulators])
+    return simulators, block
+
+
+class FleetSimulator:
+    """
+    Simulates many machines sharded across worker processes and merges them into one telemetry stream.
+    Exposes the same `clock` / `advance(until)` interface as MachineSimulator.
+    With a seeded config, the stream does not depend on the number of workers.
+    """
+    def __init__(self, config=None, workers=None):
+        config = config if config else SimulationConfig()
+        self.simulators = config.simulators()
+        self.clock = self.simulators[0].clock
+        self.workers = max(1, min(workers if workers else os.cpu_count() or 1, len(self.simulators)))
+        self.shards = [list(range(i, len(self.simulators), self.workers)) for i in range(self.workers)]
+        self.executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+
+    @property
+    def tools_count(self):
+        return max(simulator.tools_count for simulator in self.simulators)
+
+    @property
+    def part_id(self):
+        return sum(simulator.part_id for simulator in self.simulators)
+
+    def advance(self, until):
+        """
+        All rows of the fleet timestamped before `until`, ordered by timestamp.
+        """
+        if self.executor is None:
+            _, block = advance_shard(self.simulators, until)
+        else:
+            futures = [
+                self.executor.submit(advance_shard, [self.simulators[i] for i in shard], until)
+                for shard in self.shards
+            ]
+            blocks = []
+            for shard, future in zip(self.shards, futures):
+                simulators, block = future.result()
+                for i, simulator in zip(shard, simulators):
+                    self.simulators[i] = simulator
+                blocks.append(block)
+            block = merge_blocks(blocks)
+        self.clock = max(self.clock, until)
+        return block
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
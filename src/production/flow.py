@@ -1,99 +1,230 @@
 import asyncio
-import random
+import os
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from typing import Optional
 
 import numpy as np
-import pandas as pd
 
-from .downtime import machine_errors
+from .buffer import TelemetryBuffer
+from .downtime import machine_errors, error_profiles
+from .schema import ERROR_CODES, empty_block, merge_blocks
+from .specs import SPEC_PRODUCT, registry
+from .store import TelemetryStore
 
-TOOLS_COUNT = 2
+MACHINES_COUNT = int(os.getenv("MACHINES_COUNT", 1))
+TOOLS_PER_MACHINE = int(os.getenv("TOOLS_PER_MACHINE", 2))
+TOOLS_COUNT = MACHINES_COUNT * TOOLS_PER_MACHINE
+SIMULATION_SEED = int(os.getenv("SIMULATION_SEED")) if os.getenv("SIMULATION_SEED") else None
+TELEMETRY_STORE = os.getenv("TELEMETRY_STORE")      # directory persisting the live telemetry, disabled when unset
+SEEDED_START = datetime(2025, 1, 1)                 # virtual clock start of seeded runs given no start
 
-async def generate_data(state):
+BLOCK_SIZE = 5              # simulated seconds drawn per batch
+PART_INTERVAL = 0.2         # real seconds spent per part when running live
+
+NON_COMPLIANCE_RATES = np.array([0.05, 0.10])     # cycled over the tools of a machine
+
+ERROR_DOWNTIMES = np.array([int(error["downtime"].total_seconds()) for error in machine_errors.values()])
+ERROR_MTBF = np.array([error["mtbf"].total_seconds() for error in machine_errors.values()])
+
+
+def failure_rates(profile):
     """
-    Generate synthetic production data for a manufacturing process.
+    Failure rate of each error code (per operating second) for an error profile.
+    """
+    profile = error_profiles[profile]
+    weights = np.array([profile["weights"].get(code, 1) for code in ERROR_CODES], dtype=float)
+    return profile["rate_factor"] * weights / ERROR_MTBF
+
+
+@dataclass
+class MachineConfig:
+    machine_id: int = 1
+    tools_count: int = TOOLS_PER_MACHINE
+    first_tool: int = 1             # fleet-wide ID of the machine's first tool
+    profile: str = "standard"       # key in error_profiles
+    product: str = SPEC_PRODUCT     # key in the specification registry
+
+
+def fleet_machines(machines_count=MACHINES_COUNT, tools_per_machine=TOOLS_PER_MACHINE):
+    """
+    Machine configurations of a fleet, with consecutive tool IDs and error profiles assigned in turn.
     """
-    current_time = state["date"] if state["date"] else datetime.now()
-    part_id = state["part_id"] if state["part_id"] else 0
+    profiles = list(error_profiles.keys())
+    return [
+        MachineConfig(
+            machine_id=i + 1,
+            tools_count=tools_per_machine,
+            first_tool=i * tools_per_machine + 1,
+            profile=profiles[i % len(profiles)],
+        )
+        for i in range(machines_count)
+    ]
+
+
+def generate_parts(part_id, n_parts, machine, part_rng, drift_rng):
+    """
+    Draw `n_parts` consecutive parts of one machine at once with NumPy.
+    Every part consumes the same amount of each random stream, in part order, so splitting
+    the parts into more or fewer batches yields exactly the same values.
+    Returns part IDs, fleet-wide tool IDs, positions, orientations and compliance.
+    """
+    part_ids = part_id + np.arange(n_parts)
+    local_tools = part_ids % machine.tools_count
 
-    non_compliance_rates = {
-        1: 0.05,
-        2: 0.10,
+    noise = part_rng.standard_normal((n_parts, 4))
+    drift = drift_rng.random(n_parts) < NON_COMPLIANCE_RATES[local_tools % len(NON_COMPLIANCE_RATES)]
+
+    measures = {
+        "position": 0.4 + np.where(drift, 0.2 * noise[:, 2], 0.03 * noise[:, 0]),
+        "orientation": 0.4 + np.where(drift, 0.3 * noise[:, 3], 0.06 * noise[:, 1]),
     }
+    tool_ids = machine.first_tool + local_tools
+
+    values = np.column_stack([measures[name] for name in registry.characteristics])
+    compliant = registry.compliance(values, tool_ids, machine.product)
+    return part_ids, tool_ids, np.round(measures["position"], 4), np.round(measures["orientation"], 4), compliant
 
-    if 'raw_df' not in state['data']:
-        state['data']['raw_df'] = pd.DataFrame(columns=[
-            "Part ID", "Timestamp", "Position", "Orientation", "Tool ID",
-            "Compliance", "Event", "Error Code", "Error Description",
-            "Downtime Start", "Downtime End"
-        ])
 
-    for _ in range(1000):
+@dataclass
+class SimulationConfig:
+    machines_count: int = MACHINES_COUNT
+    tools_per_machine: int = TOOLS_PER_MACHINE
+    seed: Optional[int] = SIMULATION_SEED      # None draws fresh OS entropy
+    start: Optional[datetime] = None            # virtual clock start, SEEDED_START if seeded else now by default
+
+    @property
+    def tools_count(self):
+        return self.machines_count * self.tools_per_machine
+
+    def machines(self):
+        return fleet_machines(self.machines_count, self.tools_per_machine)
+
+    def simulators(self, part_id=0):
+        """
+        One simulator per machine, each with independent random streams spawned from the seed.
+        A seeded run without a start begins at SEEDED_START, so that its timestamps are reproducible too.
+        """
+        start = self.start if self.start else SEEDED_START if self.seed is not None else datetime.now()
+        seeds = np.random.SeedSequence(self.seed).spawn(self.machines_count)
+        return [
+            MachineSimulator(machine, start=start, part_id=part_id, seed=seed)
+            for machine, seed in zip(self.machines(), seeds)
+        ]
+
+
+class MachineSimulator:
+    """
+    Discrete-event simulator of one machine.
+    Each error code has its own time to next failure, drawn from an exponential distribution of its MTBF
+    and counted in operating seconds. The simulator jumps from one failure to the next and draws the
+    parts produced in between (one per operating second) in a single batch, so its cost scales with
+    the number of events rather than the simulated duration.
+    Failures, parts and drifts use separate random streams spawned from `seed` (an int or a
+    np.random.SeedSequence), so a seeded run is reproducible whatever the batch boundaries.
+    """
+    def __init__(self, machine=None, start=None, part_id=0, seed=None):
+        self.machine = machine if machine else MachineConfig()
+        self.clock = (start if start else datetime.now()).replace(microsecond=0)
+        self.part_id = part_id
+        seed = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.failure_rng, self.part_rng, self.drift_rng = [np.random.default_rng(s) for s in seed.spawn(3)]
+        self.rates = failure_rates(self.machine.profile)
+        self.operating = 0          # operating seconds since start
+        self.failure_at = self.failure_rng.exponential(1 / self.rates)      # operating second of next failure per code
+
+    @property
+    def tools_count(self):
+        """Highest tool ID produced, i.e. the number of tool categories of the stream."""
+        return self.machine.first_tool + self.machine.tools_count - 1
+
+    def step(self, size=BLOCK_SIZE):
+        """Next `size` simulated seconds."""
+        return self.advance(self.clock + timedelta(seconds=size))
+
+    def advance(self, until):
+        """
+        All rows timestamped before `until`.
+        The clock may stay after `until` when a downtime overlaps it.
+        """
+        now = np.datetime64(self.clock, 's')
+        end = np.datetime64(until, 's')
+        remaining = int((end - now) / np.timedelta64(1, 's'))
+
+        # Walk the failure events: parts run from `starts` for `counts` seconds, errors follow some of the runs
+        starts, counts, error_times, error_idx = [], [], [], []
+        elapsed = 0
+        while elapsed < remaining:
+            code = int(np.argmin(self.failure_at))
+            run = int(max(self.failure_at[code] - self.operating, 0))
+            if run >= remaining - elapsed:
+                run = remaining - elapsed
+                starts.append(elapsed)
+                counts.append(run)
+                self.operating += run
+                elapsed += run
+                break
+            starts.append(elapsed)
+            counts.append(run)
+            error_times.append(elapsed + run)
+            error_idx.append(code)
+            self.operating += run + 1
+            self.failure_at[code] = self.operating + self.failure_rng.exponential(1 / self.rates[code])
+            elapsed += run + 1 + int(ERROR_DOWNTIMES[code])
+
+        counts = np.array(counts, dtype=np.int64)
+        n_parts = int(counts.sum())
+        offsets = np.repeat(np.array(starts, dtype=np.int64) - np.cumsum(counts) + counts, counts) + np.arange(n_parts)
+
+        parts = empty_block(n_parts)
+        parts["machine_id"][:] = self.machine.machine_id
+        parts["timestamp"] = now + offsets.astype('timedelta64[s]')
+        (
+            parts["part_id"], parts["tool_id"][:], parts["position"][:], parts["orientation"][:], parts["compliance"]
+        ) = generate_parts(self.part_id, n_parts, self.machine, self.part_rng, self.drift_rng)
+
+        error_idx = np.array(error_idx, dtype=np.int8)
+        errors = empty_block(len(error_idx))
+        errors["machine_id"][:] = self.machine.machine_id
+        errors["timestamp"] = now + np.array(error_times, dtype=np.int64).astype('timedelta64[s]')
+        errors["error_code"] = error_idx
+        errors["downtime"] = ERROR_DOWNTIMES[error_idx].astype(np.int32)
+
+        self.clock = (now + np.timedelta64(elapsed, 's')).astype(datetime)
+        self.part_id += n_parts
+        return merge_blocks([parts, errors])
+
+
+async def generate_data(state):
+    """
+    Generate synthetic production data for a manufacturing process.
+    """
+    current_time = (state["date"] if state["date"] else datetime.now()).replace(microsecond=0)
+
+    buffer = state['data'].setdefault('buffer', TelemetryBuffer(tools_count=TOOLS_COUNT))
+    if 'simulators' not in state['data']:
+        config = SimulationConfig(start=current_time)
+        state['data']['simulators'] = config.simulators(part_id=state["part_id"] if state["part_id"] else 0)
+    simulators = state['data']['simulators']
+    if TELEMETRY_STORE and 'store' not in state['data']:
+        state['data']['store'] = TelemetryStore(TELEMETRY_STORE)
+    store = state['data'].get('store')
+
+    for _ in range(1000 // BLOCK_SIZE):
         if not state["running"]:
             break
 
-        if random.random() < 0.01:     # 0.005
-            error_key = random.choice(list(machine_errors.keys()))
-            error = machine_errors[error_key]
-            downtime = error["downtime"]
-
-            new_row = pd.DataFrame([{
-                "Part ID": "N/A",
-                "Timestamp": current_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "Position": "N/A",
-                "Orientation": "N/A",
-                "Tool ID": "N/A",
-                "Compliance": "N/A",
-                "Event": "Machine Error",
-                "Error Code": error_key,
-                "Error Description": error["description"],
-                "Downtime Start": current_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "Downtime End": (current_time + downtime).strftime("%Y-%m-%d %H:%M:%S")
-            }])
-
-            state['data']['raw_df'] = pd.concat([state['data']['raw_df'], new_row], ignore_index=True)
-
-            current_time += downtime
-        else:
-            position = np.random.normal(loc=0.4, scale=0.03)
-            orientation = np.random.normal(loc=0.4, scale=0.06)
-            tool_id = (part_id % TOOLS_COUNT) + 1
-
-            if random.random() < non_compliance_rates[tool_id]:
-                position = np.random.normal(loc=0.4, scale=0.2)
-                orientation = np.random.normal(loc=0.4, scale=0.3)
-
-            compliance = 'OK' if (0.3 <= position <= 0.5) and (0.2 <= orientation <= 0.6) else 'NOK'
-
-            new_row = pd.DataFrame([{
-                "Part ID": part_id,
-                "Timestamp": current_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "Position": round(position, 4),
-                "Orientation": round(orientation, 4),
-                "Tool ID": tool_id,
-                "Compliance": compliance,
-                "Event": "N/A",
-                "Error Code": "N/A",
-                "Error Description": "N/A",
-                "Downtime Start": "N/A",
-                "Downtime End": "N/A"
-            }])
-
-            if (
-                    (not new_row.empty and not new_row.isna().all().all())
-                and \
-                    (not state['data']['raw_df'].empty and not state['data']['raw_df'].isna().all().all())
-            ):
-                state['data']['raw_df'] = pd.concat([state['data']['raw_df'], new_row], ignore_index=True)
-
-            elif not new_row.empty and not new_row.isna().all().all():
-                state['data']['raw_df'] = new_row.copy()
-
-            #print(f"- part {part_id} data generated")
-            part_id += 1
-            await asyncio.sleep(0.2)
-
-        current_time += timedelta(seconds=1)
+        current_time += timedelta(seconds=BLOCK_SIZE)
+        block = merge_blocks([simulator.advance(current_time) for simulator in simulators])
+        buffer.append(block)
+        if store is not None:
+            store.append(block)
+
+        produced = int((block["tool_id"] > 0).sum())
+        await asyncio.sleep(PART_INTERVAL * produced / len(simulators))
+
+    if store is not None:
+        store.flush()
 
     state["date"] = current_time
-    state["part_id"] = part_id
\ No newline at end of file
+    state["part_id"] = sum(simulator.part_id for simulator in simulators)
@@ -0,0 +1,122 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from .buffer import TelemetryBuffer
+from .fleet import FleetSimulator
+from .flow import MachineSimulator, SimulationConfig
+from .schema import to_frame
+from .store import TelemetryStore
+
+HEADLESS_WINDOW = timedelta(hours=6)    # simulated time drawn per batch when fast-forwarding
+
+
+class CsvSink:
+    """
+    Streams telemetry blocks to a CSV file, in the layout shown to the agent.
+    """
+    def __init__(self, path, tools_count):
+        self.path = path
+        self.tools_count = tools_count
+        self.file = open(path, "w", newline="")
+        self.header = True
+
+    def append(self, block):
+        to_frame(block, self.tools_count).to_csv(
+            self.file,
+            header=self.header,
+            index=False,
+            na_rep="N/A",
+            date_format="%Y-%m-%d %H:%M:%S",
+            float_format="%.4f",
+        )
+        self.header = False
+
+    def close(self):
+        self.file.close()
+
+
+def run_headless(duration, simulator=None, sink=None, window=HEADLESS_WINDOW):
+    """
+    Run the production simulator on its virtual clock as fast as possible.
+    The clock only moves with the simulated events: no sleep between parts.
+    Args:
+        duration (timedelta): Simulated time to produce, e.g. "7d".
+        simulator: MachineSimulator or FleetSimulator, a single default machine starting now if omitted.
+        sink: Object with an `append(block)` method receiving each block (TelemetryBuffer, TelemetryStore, CsvSink...).
+        window (timedelta): Simulated time drawn per batch.
+    Returns:
+        dict: Run report with produced rows, parts, final clock and throughput.
+    """
+    simulator = simulator if simulator else MachineSimulator()
+    current_time = simulator.clock
+    end_time = current_time + pd.Timedelta(duration).to_pytimedelta()
+    first_part_id = simulator.part_id
+    rows = 0
+
+    started = time.perf_counter()
+    while current_time < end_time:
+        current_time = min(current_time + window, end_time)
+        block = simulator.advance(current_time)
+        if sink is not None:
+            sink.append(block)
+        rows += len(block["timestamp"])
+    elapsed = time.perf_counter() - started
+
+    parts = simulator.part_id - first_part_id
+    return {
+        "rows": rows,
+        "parts": parts,
+        "date": current_time,
+        "elapsed": elapsed,
+        "parts_per_second": parts / elapsed if elapsed > 0 else float("inf"),
+    }
+
+
+def main():
+    """Command line entry point: `python -m src.production.headless --duration 7d --output week.csv`."""
+    parser = argparse.ArgumentParser(description="Fast-forward the production simulator on a virtual clock.")
+    parser.add_argument("--duration", default="1d", help="Simulated time to produce, e.g. 8h, 7d (default: 1d)")
+    parser.add_argument("--start", default=None, help="Virtual clock start, ISO format (default: 2025-01-01 with --seed, else now)")
+    parser.add_argument("--output", default=None, help="CSV file receiving the telemetry (default: in-memory buffer)")
+    parser.add_argument("--store", default=None, help="Telemetry store directory receiving partitioned Parquet files")
+    parser.add_argument("--machines", type=int, default=1, help="Number of simulated machines (default: 1)")
+    parser.add_argument("--tools", type=int, default=2, help="Tools per machine (default: 2)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for a fleet (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for a reproducible run, timestamps included (default: random)")
+    parser.add_argument("--window", default="6h", help="Simulated time drawn per batch (default: 6h)")
+    args = parser.parse_args()
+
+    config = SimulationConfig(
+        machines_count=args.machines,
+        tools_per_machine=args.tools,
+        seed=args.seed,
+        start=datetime.fromisoformat(args.start) if args.start else None,
+    )
+    if args.machines > 1:
+        simulator = FleetSimulator(config, workers=args.workers)
+    else:
+        simulator = config.simulators()[0]
+
+    if args.output:
+        sink = CsvSink(args.output, simulator.tools_count)
+    elif args.store:
+        sink = TelemetryStore(args.store)
+    else:
+        sink = TelemetryBuffer(tools_count=simulator.tools_count)
+    try:
+        report = run_headless(args.duration, simulator=simulator, sink=sink, window=pd.Timedelta(args.window).to_pytimedelta())
+    finally:
+        if isinstance(sink, (CsvSink, TelemetryStore)):
+            sink.close()
+        if isinstance(simulator, FleetSimulator):
+            simulator.close()
+
+    print(f"- {report['parts']} parts ({report['rows']} rows) simulated until {report['date']}")
+    print(f"- {report['elapsed']:.2f}s elapsed, {report['parts_per_second']:,.0f} parts/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Telemetry ingestion API for shop-floor gateways.
+"""
+
+from src.production.ingest.routes import router
+
+__all__ = ['router']
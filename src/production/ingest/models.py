@@ -0,0 +1,26 @@
+"""
+Data models of the ingestion API.
+"""
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class IngestResponse(BaseModel):
+    """Response to an accepted telemetry batch."""
+    accepted: int = Field(..., description="Number of rows accepted in the batch")
+    queued_batches: int = Field(..., description="Batches waiting for the writer, this one included")
+
+
+class IngestStatus(BaseModel):
+    """State of the telemetry writer."""
+    queued_batches: int = Field(..., description="Batches waiting for the writer")
+    max_queued_batches: int = Field(..., description="Queue size above which batches are rejected")
+    written_rows: int = Field(..., description="Rows handed to the store since startup")
+    rejected_batches: int = Field(..., description="Batches rejected because the writer was behind")
+    last_timestamp: Optional[str] = Field(None, description="Latest telemetry timestamp written")
+
+
+class ValidationErrorDetail(BaseModel):
+    """Rows of a batch failing one validation rule."""
+    rule: str = Field(..., description="Failed validation rule")
+    rows: List[int] = Field(..., description="Indices of the first offending rows")
@@ -0,0 +1,49 @@
+"""
+Routes of the ingestion API.
+"""
+from typing import Dict, Any
+
+from fastapi import APIRouter, HTTPException, Request
+
+from src.production.ingest.models import IngestResponse, IngestStatus
+from src.production.ingest.validation import PayloadError, parse_payload, validate_table
+from src.production.ingest.writer import IngestWriter, WriterBehindError
+
+router = APIRouter()
+writer = IngestWriter()
+
+
+@router.post("/telemetry", response_model=IngestResponse, tags=["Ingestion"])
+async def ingest_telemetry(request: Request) -> Dict[str, Any]:
+    """
+    Ingest a batch of telemetry rows from a shop-floor gateway.
+
+    - **application/json**: array of rows, or {"rows": [...]}
+    - **application/x-ndjson**: one row per line
+    - **application/vnd.apache.arrow.stream**: Arrow IPC stream
+
+    Rows carry `machine_id`, `timestamp` and either a part (`part_id`, `tool_id`, `position`,
+    `orientation`, `compliance`) or a machine error (`error_code`, `downtime` in seconds).
+    The whole batch is rejected with 422 if any row is invalid, and with 503 when the writer is behind.
+    """
+    body = await request.body()
+    try:
+        block = validate_table(parse_payload(body, request.headers.get("content-type")))
+    except PayloadError as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "errors": e.details})
+
+    try:
+        await writer.submit(block)
+    except WriterBehindError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+    return {
+        "accepted": len(block["timestamp"]),
+        "queued_batches": writer.queue.qsize(),
+    }
+
+
+@router.get("/telemetry/status", response_model=IngestStatus, tags=["Ingestion"])
+async def ingest_status() -> Dict[str, Any]:
+    """State of the telemetry writer: queue depth, written rows and rejected batches."""
+    return writer.status()
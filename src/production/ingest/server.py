@@ -0,0 +1,73 @@
+"""
+FastAPI server of the ingestion API.
+"""
+import os
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from dotenv import load_dotenv
+
+from src.production.ingest.routes import router, writer
+
+# Environment variables
+load_dotenv()
+
+# Configuration
+INGEST_HOST = os.getenv("INGEST_HOST", "0.0.0.0")
+INGEST_PORT = int(os.getenv("INGEST_PORT", 8001))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the store writer for the lifetime of the server, flushing it on shutdown."""
+    writer.start()
+    yield
+    await writer.stop()
+
+
+# FastAPI application
+app = FastAPI(
+    title="Efficiency Agent Telemetry Ingestion API",
+    description="""
+    Batched telemetry ingestion for shop-floor gateways.
+    Accepted rows are appended to the telemetry store read by the dashboard.
+    """,
+    docs_url="/docs",
+    redoc_url="/redoc",
+    lifespan=lifespan,
+)
+
+# Routes
+app.include_router(router, prefix="/api")
+
+# Exception handler
+@app.exception_handler(Exception)
+async def global_exception_handler(request: Request, exc: Exception):
+    """Global exception handler."""
+    logging.error(f"Unhandled exception: {str(exc)}")
+    return JSONResponse(
+        status_code=500,
+        content={"detail": f"Internal server error: {str(exc)}"}
+    )
+
+# Health check
+@app.get("/health", tags=["Informations"])
+async def health_check():
+    """API health check."""
+    return {"status": "ok", **writer.status()}
+
+
+def start():
+    """Start the server with uvicorn."""
+    import uvicorn
+    uvicorn.run(
+        "src.production.ingest.server:app",
+        host=INGEST_HOST,
+        port=INGEST_PORT,
+    )
+
+
+if __name__ == "__main__":
+    start()
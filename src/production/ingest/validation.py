@@ -0,0 +1,147 @@
+"""
+Vectorized parsing and validation of telemetry batches.
+"""
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.json as pa_json
+
+from src.production.schema import ERROR_CODES, empty_block
+
+MAX_REPORTED_ROWS = 20
+INGEST_MAX_AGE = pd.Timedelta(os.getenv("INGEST_MAX_AGE", "30d"))      # oldest accepted timestamp, before the server clock
+INGEST_MAX_AHEAD = pd.Timedelta(os.getenv("INGEST_MAX_AHEAD", "1d"))   # latest accepted timestamp, after the server clock
+
+MAX_ID = np.iinfo(np.int16).max             # machine and tool IDs are stored as int16
+MAX_PART_ID = np.iinfo(np.int64).max
+MAX_DOWNTIME = np.iinfo(np.int32).max
+MAX_EPOCH_SECONDS = 9e9                     # beyond, an epoch does not fit datetime64[ns] (year 2262)
+
+JSON_TYPES = ("application/json",)
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+ARROW_TYPES = ("application/vnd.apache.arrow.stream",)
+
+INGEST_COLUMNS = [
+    "machine_id", "timestamp", "part_id", "tool_id", "position", "orientation",
+    "compliance", "error_code", "downtime",
+]
+
+
+class PayloadError(ValueError):
+    """Raised when a telemetry batch cannot be parsed or fails validation."""
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.details = details if details else []
+
+
+def parse_payload(body, content_type):
+    """
+    Arrow table from a batch body: a JSON array of rows (or {"rows": [...]}), NDJSON, or an Arrow IPC stream.
+    """
+    content_type = (content_type or "application/json").split(";")[0].strip().lower()
+    try:
+        if content_type in ARROW_TYPES:
+            return pa.ipc.open_stream(io.BytesIO(body)).read_all()
+        if content_type in NDJSON_TYPES:
+            return pa_json.read_json(io.BytesIO(body))
+        if content_type in JSON_TYPES:
+            rows = json.loads(body)
+            rows = rows.get("rows", []) if isinstance(rows, dict) else rows
+            names = sorted({name for row in rows for name in row})     # rows may omit the fields they do not use
+            return pa.Table.from_pydict({name: [row.get(name) for row in rows] for name in names})
+    except (ValueError, TypeError, AttributeError, pa.ArrowException) as e:
+        raise PayloadError(f"Malformed {content_type} payload: {e}")
+    raise PayloadError(f"Unsupported content type: {content_type}")
+
+
+def _column(df, name):
+    return df[name] if name in df.columns else pd.Series(np.nan, index=df.index)
+
+
+def _parse_timestamps(values):
+    """
+    Timestamps of a column of ISO dates or epochs, and the mask of the epochs too far to be dates.
+    Epochs are read as milliseconds or seconds row by row, so that one bad row does not change the others.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        epoch = values.to_numpy(dtype=np.float64)
+        seconds = np.where(np.abs(epoch) > 1e11, epoch / 1000, epoch)      # epoch milliseconds or seconds
+        overflow = ~np.isnan(epoch) & ~(np.abs(seconds) < MAX_EPOCH_SECONDS)
+        seconds[overflow] = np.nan
+        return pd.Series(pd.to_datetime(seconds, unit="s"), index=values.index), overflow
+    timestamps = pd.to_datetime(values, errors="coerce", utc=True, format="ISO8601")
+    return timestamps.dt.tz_localize(None), np.zeros(len(values), dtype=bool)
+
+
+def validate_table(table):
+    """
+    Telemetry block (see schema.FIELDS) from a parsed batch, with every rule checked on whole columns.
+    Each row is either a part (part_id, tool_id, position, orientation, compliance)
+    or a machine error (error_code, downtime).
+    Raises PayloadError listing the offending rows of each failed rule.
+    """
+    unknown = sorted(set(table.column_names) - set(INGEST_COLUMNS))
+    if unknown:
+        raise PayloadError(f"Unknown columns: {', '.join(unknown)}")
+    if table.num_rows == 0:
+        return empty_block(0)
+
+    df = table.to_pandas()
+    timestamp, overflow = _parse_timestamps(_column(df, "timestamp"))
+    machine_id = pd.to_numeric(_column(df, "machine_id"), errors="coerce")
+    part_id = pd.to_numeric(_column(df, "part_id"), errors="coerce")
+    tool_id = pd.to_numeric(_column(df, "tool_id"), errors="coerce")
+    position = pd.to_numeric(_column(df, "position"), errors="coerce")
+    orientation = pd.to_numeric(_column(df, "orientation"), errors="coerce")
+    downtime = pd.to_numeric(_column(df, "downtime"), errors="coerce")
+    compliance = _column(df, "compliance")
+    error_code = _column(df, "error_code")
+    codes = pd.Categorical(error_code, categories=ERROR_CODES).codes
+
+    is_error = error_code.notna().to_numpy()
+    is_part = ~is_error
+    now = pd.Timestamp.now()
+
+    rules = {
+        "timestamp must be an ISO date or an epoch": timestamp.isna().to_numpy() & ~overflow,
+        f"timestamp must be within {INGEST_MAX_AGE} before and {INGEST_MAX_AHEAD} after the server clock": (
+            timestamp.notna() & ~timestamp.between(now - INGEST_MAX_AGE, now + INGEST_MAX_AHEAD)
+        ).to_numpy() | overflow,
+        f"machine_id must be an integer between 1 and {MAX_ID}": ~machine_id.between(1, MAX_ID).to_numpy() | (machine_id % 1 != 0).to_numpy(),
+        "error_code must be a known code": is_error & (codes < 0),
+        f"downtime must be between 0 and {MAX_DOWNTIME} seconds for an error": is_error & ~downtime.between(0, MAX_DOWNTIME).to_numpy(),
+        "part_id must be a non-negative integer for a part": is_part & (
+            ~(part_id >= 0) | ~(part_id < MAX_PART_ID) | (part_id % 1 != 0)
+        ).to_numpy(),
+        f"tool_id must be an integer between 1 and {MAX_ID} for a part": is_part & (
+            ~tool_id.between(1, MAX_ID) | (tool_id % 1 != 0)
+        ).to_numpy(),
+        "position and orientation must be finite for a part": is_part & ~(
+            np.isfinite(position.to_numpy(dtype=float)) & np.isfinite(orientation.to_numpy(dtype=float))
+        ),
+        "compliance must be a boolean for a part": is_part & ~compliance.isin([True, False]).to_numpy(),
+    }
+    details = [
+        {"rule": rule, "rows": np.flatnonzero(failed)[:MAX_REPORTED_ROWS].tolist()}
+        for rule, failed in rules.items() if failed.any()
+    ]
+    if details:
+        raise PayloadError("Invalid telemetry rows", details)
+
+    block = empty_block(len(df))
+    block["machine_id"] = machine_id.to_numpy().astype(np.int16)
+    block["timestamp"] = timestamp.to_numpy().astype("datetime64[s]")
+    block["part_id"][is_part] = part_id[is_part].astype(np.int64)
+    block["tool_id"][is_part] = tool_id[is_part].astype(np.int16)
+    block["position"][is_part] = position[is_part]
+    block["orientation"][is_part] = orientation[is_part]
+    block["compliance"][is_part] = compliance[is_part].astype(bool)
+    block["error_code"][is_error] = codes[is_error]
+    block["downtime"][is_error] = downtime[is_error].astype(np.int32)
+
+    order = np.lexsort((block["machine_id"], block["timestamp"]))
+    return {name: column[order] for name, column in block.items()}
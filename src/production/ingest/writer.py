@@ -0,0 +1,79 @@
+"""
+Background writer moving accepted batches to the telemetry store.
+"""
+import asyncio
+import os
+
+import numpy as np
+
+from src.production.store import TelemetryStore, STORE_DIR
+
+INGEST_QUEUE_BATCHES = int(os.getenv("INGEST_QUEUE_BATCHES", 64))
+INGEST_ENQUEUE_TIMEOUT = float(os.getenv("INGEST_ENQUEUE_TIMEOUT", 0.5))     # seconds
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", 1.0))       # seconds
+
+
+class WriterBehindError(RuntimeError):
+    """Raised when the writer queue stays full: the client should retry later."""
+
+
+class IngestWriter:
+    """
+    Bounded queue between the API and the telemetry store.
+    Batches are appended by a single background task, off the event loop, and flushed at least
+    every INGEST_FLUSH_INTERVAL seconds so that store readers see them. When the queue is full
+    for longer than INGEST_ENQUEUE_TIMEOUT, submit() raises WriterBehindError (backpressure).
+    """
+    def __init__(self, store=None, max_batches=INGEST_QUEUE_BATCHES, timeout=INGEST_ENQUEUE_TIMEOUT,
+                 flush_interval=INGEST_FLUSH_INTERVAL):
+        self.store = store if store else TelemetryStore(STORE_DIR)
+        self.queue = asyncio.Queue(maxsize=max_batches)
+        self.timeout = timeout
+        self.flush_interval = flush_interval
+        self.task = None
+        self.written_rows = 0
+        self.rejected_batches = 0
+        self.last_timestamp = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            await self.queue.join()
+            self.task.cancel()
+            self.task = None
+        await asyncio.to_thread(self.store.flush)
+
+    async def submit(self, block):
+        try:
+            await asyncio.wait_for(self.queue.put(block), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.rejected_batches += 1
+            raise WriterBehindError(f"Writer is behind, {self.queue.qsize()} batches queued")
+
+    async def run(self):
+        while True:
+            try:
+                block = await asyncio.wait_for(self.queue.get(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                await asyncio.to_thread(self.store.flush)
+                continue
+            try:
+                await asyncio.to_thread(self.store.append, block)
+                self.written_rows += len(block["timestamp"])
+                if len(block["timestamp"]):
+                    latest = block["timestamp"].max()
+                    self.last_timestamp = latest if self.last_timestamp is None else max(self.last_timestamp, latest)
+            finally:
+                self.queue.task_done()
+
+    def status(self):
+        return {
+            "queued_batches": self.queue.qsize(),
+            "max_queued_batches": self.queue.maxsize,
+            "written_rows": self.written_rows,
+            "rejected_batches": self.rejected_batches,
+            "last_timestamp": None if self.last_timestamp is None else str(np.datetime64(self.last_timestamp, 's')),
+        }
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+from src.production.schema import ERROR_CODES, ERROR_DESCRIPTIONS
+
+DOWNTIME_FIELDS = {
+    "timestamp": "datetime64[s]",
+    "machine_id": np.int16,
+    "error_code": np.int8,          # index in ERROR_CODES
+    "downtime": np.int32,           # seconds
+}
+
+ISSUE_COLUMNS = ["Timestamp", "Event", "Error Code", "Error Description", "Downtime Start", "Downtime End"]
+
+
+class DowntimeLog:
+    """
+    Append-only log of the machine errors, ordered by timestamp, fed by the telemetry buffer.
+    The count and cumulative downtime of each error code are updated on insert, so the pareto
+    and the per-code summary cost O(error codes) whatever the number of events.
+    """
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in DOWNTIME_FIELDS.items()}
+        self.counts = np.zeros(len(ERROR_CODES), dtype=np.int64)       # indexed by error code
+        self.seconds = np.zeros(len(ERROR_CODES), dtype=np.int64)
+
+    @classmethod
+    def follow(cls, buffer):
+        """Machine errors among the rows of a TelemetryBuffer, logged as they are appended."""
+        log = cls()
+        log.update(buffer.latest())
+        buffer.listeners.append(log.update)
+        return log
+
+    def __len__(self):
+        return self.size
+
+    def update(self, block):
+        is_error = block["error_code"] >= 0
+        if not is_error.any():
+            return
+        events = {name: np.asarray(block[name])[is_error].astype(dtype) for name, dtype in DOWNTIME_FIELDS.items()}
+        order = np.argsort(events["timestamp"], kind="stable")
+        events = {name: column[order] for name, column in events.items()}
+
+        codes = events["error_code"].astype(np.int64)
+        self.counts += np.bincount(codes, minlength=len(self.counts))
+        self.seconds += np.bincount(codes, weights=events["downtime"], minlength=len(self.seconds)).astype(np.int64)
+
+        added = len(codes)
+        if self.size + added > len(self.columns["timestamp"]):
+            capacity = max(self.size + added, 2 * len(self.columns["timestamp"]))
+            for name, column in self.columns.items():
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                self.columns[name] = grown
+
+        # late events are merged into the tail they belong to, keeping the log ordered
+        first = np.searchsorted(self.columns["timestamp"][:self.size], events["timestamp"][0], side="right")
+        for name, column in self.columns.items():
+            column[self.size:self.size + added] = events[name]
+        self.size += added
+        if first < self.size - added:
+            tail = slice(first, self.size)
+            order = np.argsort(self.columns["timestamp"][tail], kind="stable")
+            for column in self.columns.values():
+                column[tail] = column[tail][order]
+
+    def events(self, start=None, end=None):
+        """Views of the events timestamped in [start, end), oldest first."""
+        timestamps = self.columns["timestamp"][:self.size]
+        first = 0 if start is None else np.searchsorted(timestamps, np.datetime64(start, "s"))
+        stop = self.size if end is None else np.searchsorted(timestamps, np.datetime64(end, "s"))
+        return {name: column[first:stop] for name, column in self.columns.items()}
+
+    def to_frame(self, n=None):
+        """Latest `n` events, oldest first, with the issue columns of the telemetry frame."""
+        start = 0 if n is None else max(self.size - n, 0)
+        events = {name: column[start:self.size] for name, column in self.columns.items()}
+        codes = events["error_code"].astype(np.int64)
+        timestamp = events["timestamp"].astype("datetime64[ns]")
+        return pd.DataFrame({
+            "Timestamp": timestamp,
+            "Event": "Machine Error",
+            "Error Code": ERROR_CODES[codes],
+            "Error Description": ERROR_DESCRIPTIONS[codes],
+            "Downtime Start": timestamp,
+            "Downtime End": timestamp + events["downtime"].astype("timedelta64[s]").astype("timedelta64[ns]"),
+        }, columns=ISSUE_COLUMNS)
+
+    def pareto(self):
+        """Error codes that occurred, by decreasing cumulative downtime, with the cumulative share of it."""
+        codes = np.flatnonzero(self.counts)
+        codes = codes[np.argsort(-self.seconds[codes], kind="stable")]
+        minutes = self.seconds[codes] / 60
+        total = minutes.sum()
+        return pd.DataFrame({
+            "Error Code": ERROR_CODES[codes],
+            "Error Description": ERROR_DESCRIPTIONS[codes],
+            "Count": self.counts[codes],
+            "Downtime (min)": minutes,
+            "Cumulative %": np.cumsum(minutes) / total * 100 if total > 0 else np.zeros(len(codes)),
+        })
+
+    def summary(self):
+        """Count, cumulative downtime and MTTR of every error code that occurred."""
+        return {
+            str(ERROR_CODES[code]): {
+                "description": str(ERROR_DESCRIPTIONS[code]),
+                "count": int(self.counts[code]),
+                "downtime": str(pd.Timedelta(seconds=int(self.seconds[code]))),
+                "MTTR": str(pd.Timedelta(seconds=int(self.seconds[code])) / int(self.counts[code])),
+            }
+            for code in np.flatnonzero(self.counts)
+        }
@@ -1,24 +1,19 @@
+import numpy as np
 import pandas as pd
 
-async def machine_metrics(raw_data):
-    df = pd.DataFrame(raw_data)
 
-    datetime_cols = ['Timestamp', 'Downtime Start', 'Downtime End']
-    for col in datetime_cols:
-        df[col] = pd.to_datetime(df[col], errors='coerce', format="%Y-%m-%d %H:%M:%S")
-
-    opening_time = df['Timestamp'].max() - df['Timestamp'].min()
+def oee_metrics(opening_time, unplanned_stop_time, nok_count, downtime_count, quality_by_tool):
+    """
+    Machine metrics dict from the totals of a period, shared by MachineMetrics and Rollups.
+    """
     required_time = opening_time
     # planned_stop_time = 0 non implémenté
 
-    downtime_df = df.dropna(subset=['Downtime Start', 'Downtime End'])
-    unplanned_stop_time = (downtime_df['Downtime End'] - downtime_df['Downtime Start']).sum()
     operating_time = required_time - unplanned_stop_time
 
     net_time = operating_time
     # cadency_variance = 0 non implémenté
 
-    nok_count = (df['Compliance'] != 'OK').sum()
     useful_time = net_time - pd.Timedelta(seconds=nok_count)
 
     operating_sec = operating_time.total_seconds()
@@ -31,18 +26,9 @@ async def machine_metrics(raw_data):
 
     OEE = (quality_rate / 100) * (operating_rate / 100) * (availability_rate / 100) * 100
 
-    downtime_count = len(downtime_df)
     mtbf = operating_time / downtime_count if downtime_count > 0 else pd.Timedelta(0)
     mttr = unplanned_stop_time / downtime_count if downtime_count > 0 else pd.Timedelta(0)
 
-    # Quality rate per tool ID
-    quality_by_tool = {}
-    for tool_id in [1, 2]:
-        tool_df = df[df["Tool ID"] == tool_id]
-        total = len(tool_df)
-        ok_count = (tool_df["Compliance"] == "OK").sum()
-        quality_by_tool[f"quality_rate_tool_{tool_id}"] = round(((ok_count / total) * 100), 2) if total > 0 else 0
-
     return {
         "opening_time": str(opening_time),
         "required_time": str(required_time),
@@ -59,10 +45,75 @@ async def machine_metrics(raw_data):
         "MTTR": str(mttr)
     }
 
-async def fetch_issues(raw_data):
-    df = pd.DataFrame(raw_data)
-    issues = df[df["Event"] == "Machine Error"]
-    selected_issues = issues[
-        ["Timestamp", "Event", "Error Code", "Error Description", "Downtime Start", "Downtime End"]
-    ]
-    return selected_issues
\ No newline at end of file
+
+class MachineMetrics:
+    """
+    Running totals behind the machine metrics, updated from each new telemetry block in O(block rows)
+    instead of recomputed over the whole window: first timestamp and last repair end per machine,
+    downtime seconds and count, NOK rows, and OK / total parts per tool.
+    """
+    def __init__(self, tools_count=2):
+        self.tools_count = tools_count
+        self.first_seen = np.zeros(0, dtype=np.int64)       # epoch seconds, indexed by machine ID
+        self.last_seen = np.zeros(0, dtype=np.int64)
+        self.unplanned_seconds = 0
+        self.downtime_count = 0
+        self.nok_count = 0
+        self.tool_parts = np.zeros(tools_count + 1, dtype=np.int64)     # indexed by tool ID
+        self.tool_ok = np.zeros(tools_count + 1, dtype=np.int64)
+
+    @classmethod
+    def follow(cls, buffer):
+        """Totals over the rows of a TelemetryBuffer, kept up to date on every append."""
+        metrics = cls(buffer.tools_count)
+        metrics.update(buffer.latest())
+        buffer.listeners.append(metrics.update)
+        return metrics
+
+    def update(self, block):
+        if len(block["timestamp"]) == 0:
+            return
+        machine_id = block["machine_id"].astype(np.int64)
+        timestamp = block["timestamp"].astype("datetime64[s]").astype(np.int64)
+
+        machines = int(machine_id.max()) + 1
+        if machines > len(self.first_seen):
+            grown = machines - len(self.first_seen)
+            self.first_seen = np.append(self.first_seen, np.full(grown, np.iinfo(np.int64).max))
+            self.last_seen = np.append(self.last_seen, np.full(grown, np.iinfo(np.int64).min))
+        np.minimum.at(self.first_seen, machine_id, timestamp)
+        is_error = block["error_code"] >= 0
+        np.maximum.at(self.last_seen, machine_id, timestamp + np.where(is_error, block["downtime"], 0))
+
+        self.unplanned_seconds += int(block["downtime"][is_error].sum())
+        self.downtime_count += int(is_error.sum())
+
+        is_part = block["tool_id"] > 0
+        is_ok = is_part & block["compliance"]
+        self.nok_count += len(is_ok) - int(is_ok.sum())     # error rows count as NOK
+
+        tools = max(int(block["tool_id"].max()), self.tools_count) + 1
+        parts = np.bincount(block["tool_id"][is_part], minlength=tools)
+        ok = np.bincount(block["tool_id"][is_ok], minlength=tools)
+        if tools > len(self.tool_parts):
+            self.tool_parts = np.append(self.tool_parts, np.zeros(tools - len(self.tool_parts), dtype=np.int64))
+            self.tool_ok = np.append(self.tool_ok, np.zeros(tools - len(self.tool_ok), dtype=np.int64))
+        self.tool_parts[:tools] += parts
+        self.tool_ok[:tools] += ok
+
+    def metrics(self, tools_count=None):
+        """oee_metrics dict over every row seen so far, with the number of parts produced."""
+        seen = self.first_seen <= self.last_seen
+        opening_time = pd.Timedelta(seconds=int((self.last_seen[seen] - self.first_seen[seen]).sum()))
+        unplanned_stop_time = pd.Timedelta(seconds=self.unplanned_seconds)
+
+        tools_count = self.tools_count if tools_count is None else tools_count
+        quality_by_tool = {}
+        for tool_id in range(1, tools_count + 1):
+            total = self.tool_parts[tool_id] if tool_id < len(self.tool_parts) else 0
+            ok_count = self.tool_ok[tool_id] if tool_id < len(self.tool_ok) else 0
+            quality_by_tool[f"quality_rate_tool_{tool_id}"] = round(((ok_count / total) * 100), 2) if total > 0 else 0
+
+        metrics = oee_metrics(opening_time, unplanned_stop_time, self.nok_count, self.downtime_count, quality_by_tool)
+        metrics["part_count"] = int(self.tool_parts.sum())
+        return metrics
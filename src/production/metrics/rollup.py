@@ -0,0 +1,280 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.production.metrics.machine import oee_metrics
+from src.production.schema import ERROR_CODES
+from src.production.specs import CHARACTERISTICS, SPEC_PRODUCT, capability, registry
+
+RESOLUTIONS = {"minute": 60, "hour": 3600}      # seconds per bucket
+HISTORY_WINDOWS = {"last_hour": 1, "last_shift": 8, "last_day": 24}     # hours before the latest row
+ROLLUP_HORIZON = int(pd.Timedelta(os.getenv("ROLLUP_HORIZON", "90d")).total_seconds())    # seconds kept before the newest row
+
+FILLS = {"first": np.iinfo(np.int64).max, "last": np.iinfo(np.int64).min}     # other aggregates start at 0
+PER_TOOL = ["parts", "ok", "sums", "sums2"]
+PER_MACHINE = ["first", "last"]
+
+
+def epoch_seconds(when):
+    return np.datetime64(when, 's').astype(np.int64)
+
+
+class Rollup:
+    """
+    Telemetry aggregated into fixed-size time buckets as it arrives, each row costing O(1):
+    parts and OK parts per tool, sum and sum of squares of each characteristic per tool
+    (centered on the product specification), errors and downtime seconds per error code,
+    rows, and the first timestamp and last repair end per machine.
+    Any window is then answered by merging its buckets, in O(buckets) whatever the number of parts.
+    Only the `horizon` seconds before the newest row are kept: older rows are counted in `dropped`
+    and older buckets discarded, so a stray timestamp cannot make the arrays span decades.
+    """
+    def __init__(self, resolution=60, product=SPEC_PRODUCT, horizon=ROLLUP_HORIZON):
+        self.resolution = resolution
+        self.product = product
+        self.horizon = horizon
+        self.center = np.mean(registry.limits(product=product), axis=0)
+        self.origin = None          # epoch seconds of bucket 0
+        self.buckets = 0
+        self.newest = None          # epoch seconds of the newest row
+        self.dropped = 0            # rows older than the horizon when they arrived
+        k, codes = len(CHARACTERISTICS), len(ERROR_CODES)
+        self.arrays = {             # buckets x ...
+            "rows": np.zeros(0, dtype=np.int64),
+            "parts": np.zeros((0, 1), dtype=np.int64),
+            "ok": np.zeros((0, 1), dtype=np.int64),
+            "sums": np.zeros((0, 1, k)),
+            "sums2": np.zeros((0, 1, k)),
+            "errors": np.zeros((0, codes), dtype=np.int64),
+            "downtime": np.zeros((0, codes), dtype=np.int64),
+            "first": np.zeros((0, 1), dtype=np.int64),
+            "last": np.zeros((0, 1), dtype=np.int64),
+        }
+
+    def _reserve(self, buckets, tools, machines):
+        """Grow the arrays to hold `buckets` buckets, `tools` tool IDs and `machines` machine IDs."""
+        for name, array in self.arrays.items():
+            shape = list(array.shape)
+            if buckets > shape[0]:
+                shape[0] = max(buckets, 2 * shape[0])
+            if name in PER_TOOL:
+                shape[1] = max(shape[1], tools)
+            if name in PER_MACHINE:
+                shape[1] = max(shape[1], machines)
+            if tuple(shape) != array.shape:
+                grown = np.full(shape, FILLS.get(name, 0), dtype=array.dtype)
+                grown[tuple(slice(0, size) for size in array.shape)] = array
+                self.arrays[name] = grown
+
+    def _prepend(self, buckets):
+        """Add `buckets` empty buckets before the origin, for late rows older than it."""
+        for name, array in self.arrays.items():
+            padding = np.full((buckets,) + array.shape[1:], FILLS.get(name, 0), dtype=array.dtype)
+            self.arrays[name] = np.concatenate([padding, array])
+        self.origin -= buckets * self.resolution
+        self.buckets += buckets
+
+    def _trim(self):
+        """Discard the buckets ended before the horizon, once they are as many as the ones kept."""
+        stale = (self.newest - self.horizon - self.origin) // self.resolution
+        if stale <= 0 or stale < self.buckets - stale:
+            return
+        for name, array in self.arrays.items():
+            self.arrays[name] = array[stale:self.buckets].copy()
+        self.origin += stale * self.resolution        # past the last bucket after a jump forward
+        self.buckets = max(self.buckets - stale, 0)
+
+    def update(self, block):
+        if len(block["timestamp"]) == 0:
+            return
+        seconds = block["timestamp"].astype("datetime64[s]").astype(np.int64)
+        self.newest = int(seconds.max()) if self.newest is None else max(self.newest, int(seconds.max()))
+        recent = seconds >= self.newest - self.horizon
+        if not recent.all():
+            self.dropped += int((~recent).sum())
+            if not recent.any():
+                return
+            block = {name: column[recent] for name, column in block.items()}
+            seconds = seconds[recent]
+        if self.origin is not None:
+            self._trim()
+        oldest = int(seconds.min())
+        if self.origin is None:
+            self.origin = oldest // self.resolution * self.resolution
+        if oldest < self.origin:
+            self._prepend((self.origin - oldest - 1) // self.resolution + 1)
+        bucket = (seconds - self.origin) // self.resolution
+
+        tool_id = block["tool_id"].astype(np.int64)
+        machine_id = block["machine_id"].astype(np.int64)
+        self.buckets = max(self.buckets, int(bucket.max()) + 1)
+        self._reserve(self.buckets, int(tool_id.max()) + 1, int(machine_id.max()) + 1)
+        arrays = self.arrays
+
+        np.add.at(arrays["rows"], bucket, 1)
+
+        is_part = tool_id > 0
+        at = (bucket[is_part], tool_id[is_part])
+        np.add.at(arrays["parts"], at, 1)
+        np.add.at(arrays["ok"], at, block["compliance"][is_part].astype(np.int64))
+        values = np.column_stack([np.asarray(block[name], dtype=np.float64)[is_part] for name in CHARACTERISTICS])
+        centered = values - self.center
+        np.add.at(arrays["sums"], at, centered)
+        np.add.at(arrays["sums2"], at, centered * centered)
+
+        is_error = block["error_code"] >= 0
+        at = (bucket[is_error], block["error_code"][is_error].astype(np.int64))
+        np.add.at(arrays["errors"], at, 1)
+        np.add.at(arrays["downtime"], at, block["downtime"][is_error].astype(np.int64))
+
+        end = seconds + np.where(is_error, block["downtime"], 0)       # a machine is open until its last repair ends
+        np.minimum.at(arrays["first"], (bucket, machine_id), seconds)
+        np.maximum.at(arrays["last"], (bucket, machine_id), end)
+
+    def span(self, start=None, end=None):
+        """Range [first, stop) of the buckets starting within [start, end)."""
+        if self.origin is None:
+            return 0, 0
+        first = 0 if start is None else -(-(epoch_seconds(start) - self.origin) // self.resolution)
+        stop = self.buckets if end is None else -(-(epoch_seconds(end) - self.origin) // self.resolution)
+        return int(np.clip(first, 0, self.buckets)), int(np.clip(stop, 0, self.buckets))
+
+    def merge(self, first, stop):
+        """Aggregates of the buckets [first, stop) merged together."""
+        return {
+            "first": self.arrays["first"][first:stop].min(axis=0, initial=FILLS["first"]),
+            "last": self.arrays["last"][first:stop].max(axis=0, initial=FILLS["last"]),
+            **{name: array[first:stop].sum(axis=0) for name, array in self.arrays.items() if name not in FILLS},
+        }
+
+
+def combine(totals):
+    """Single aggregate from the aggregates of disjoint windows of rollups fed with the same rows."""
+    return {
+        "first": np.min([total["first"] for total in totals], axis=0),
+        "last": np.max([total["last"] for total in totals], axis=0),
+        **{name: np.sum([total[name] for total in totals], axis=0) for name in totals[0] if name not in FILLS},
+    }
+
+
+class Rollups:
+    """
+    Per-minute and per-hour rollups of the telemetry, fed by the telemetry buffer.
+    A window is answered with the hour buckets it fully covers and the minute buckets at its edges.
+    """
+    def __init__(self, product=SPEC_PRODUCT):
+        self.product = product
+        self.rollups = {name: Rollup(resolution, product) for name, resolution in RESOLUTIONS.items()}
+        self.latest = None
+
+    @classmethod
+    def follow(cls, buffer):
+        """Rollups of the rows of a TelemetryBuffer, kept up to date on every append."""
+        rollups = cls()
+        rollups.update(buffer.latest())
+        buffer.listeners.append(rollups.update)
+        return rollups
+
+    def update(self, block):
+        if len(block["timestamp"]) == 0:
+            return
+        newest = block["timestamp"].max()
+        self.latest = newest if self.latest is None else max(self.latest, newest)
+        for rollup in self.rollups.values():
+            rollup.update(block)
+
+    def totals(self, start=None, end=None):
+        """Aggregates of the rows timestamped in [start, end), minute-aligned."""
+        minutes, hours = self.rollups["minute"], self.rollups["hour"]
+        if minutes.origin is None:
+            return None
+        first, stop = minutes.span(start, end)
+        lower = minutes.origin + first * minutes.resolution
+        upper = minutes.origin + stop * minutes.resolution
+
+        # hours fully within [lower, upper), and the minutes before and after them
+        hour_first = -(-(lower - hours.origin) // hours.resolution)
+        hour_stop = (upper - hours.origin) // hours.resolution
+        if hour_first >= hour_stop:
+            return minutes.merge(first, stop)
+        head_stop = (hours.origin + hour_first * hours.resolution - minutes.origin) // minutes.resolution
+        tail_first = (hours.origin + hour_stop * hours.resolution - minutes.origin) // minutes.resolution
+        return combine([
+            minutes.merge(first, head_stop),
+            hours.merge(hour_first, hour_stop),
+            minutes.merge(tail_first, stop),
+        ])
+
+    def oee(self, start=None, end=None, tools_count=None):
+        """oee_metrics dict over [start, end), from the buckets."""
+        totals = self.totals(start, end)
+        if totals is None:
+            return {}
+        seen = totals["first"] <= totals["last"]
+        first, last = totals["first"][seen], totals["last"][seen]
+        # a repair running past the window end only counts up to it, for the opening and the stop times
+        overrun = np.zeros(len(last), dtype=np.int64) if end is None else np.maximum(last - epoch_seconds(end), 0)
+        opening_time = pd.Timedelta(seconds=int((last - overrun - first).sum()))
+        unplanned_stop_time = pd.Timedelta(seconds=int(totals["downtime"].sum() - overrun.sum()))
+        nok_count = int(totals["rows"] - totals["ok"].sum())       # error rows count as NOK, like MachineMetrics
+
+        tools_count = len(totals["parts"]) - 1 if tools_count is None else tools_count
+        quality_by_tool = {}
+        for tool_id in range(1, tools_count + 1):
+            total = totals["parts"][tool_id] if tool_id < len(totals["parts"]) else 0
+            ok_count = totals["ok"][tool_id] if tool_id < len(totals["ok"]) else 0
+            quality_by_tool[f"quality_rate_tool_{tool_id}"] = round(((ok_count / total) * 100), 2) if total > 0 else 0
+
+        return oee_metrics(opening_time, unplanned_stop_time, nok_count, int(totals["errors"].sum()), quality_by_tool)
+
+    def capability(self, start=None, end=None):
+        """
+        Mean, std, Cp and Cpk of every characteristic over [start, end), per tool ("tool_<id>")
+        against its own limits and for all tools ("all") against the product's.
+        """
+        totals = self.totals(start, end)
+        if totals is None:
+            return {}
+        center = self.rollups["minute"].center
+        counts = totals["parts"].astype(np.float64)[:, None]
+        sums, sums2 = totals["sums"], totals["sums2"]
+        tools = np.flatnonzero(counts[:, 0] > 0)
+
+        keys = [f"tool_{tool}" for tool in tools] + ["all"]
+        n = np.vstack([counts[tools], counts.sum(axis=0)])
+        total = np.vstack([sums[tools], sums.sum(axis=0)])
+        total2 = np.vstack([sums2[tools], sums2.sum(axis=0)])
+        tool_lsl, tool_usl = registry.limits(tools, self.product)
+        lsl, usl = registry.limits(product=self.product)
+        lsl, usl = np.vstack([tool_lsl, lsl]), np.vstack([tool_usl, usl])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = np.maximum(total2 - total * total / n, 0) / (n - 1)
+            std = np.where(n > 1, np.sqrt(variance), np.nan)
+            mean = total / n + center
+        cp, cpk = capability(mean, std, lsl, usl)
+
+        result = {}
+        for i, key in enumerate(keys):
+            result[key] = {}
+            for j, (prefix, _) in enumerate(CHARACTERISTICS.values()):
+                for stat, matrix in zip(["mean", "std", "cp", "cpk"], [mean, std, cp, cpk]):
+                    result[key][f"{prefix}_{stat}"] = round(float(matrix[i, j]), 4)
+        return result
+
+    def history(self, tools_count=None, windows=HISTORY_WINDOWS):
+        """OEE and capability over each of the `windows` (hours) before the latest row."""
+        if self.latest is None:
+            return {}
+        end = pd.Timestamp(self.latest).floor("min") + pd.Timedelta(minutes=1)
+        history = {}
+        for name, hours in windows.items():
+            start = end - pd.Timedelta(hours=hours)
+            history[name] = {
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                **self.oee(start, end, tools_count),
+                "capability": self.capability(start, end),
+            }
+        return history
@@ -0,0 +1,207 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.production.specs import CHARACTERISTICS
+from src.production.store import TelemetryStore
+
+SPC_BASELINE_PARTS = int(os.getenv("SPC_BASELINE_PARTS", 100))      # parts used to set the center line and sigma
+SPC_STORE = os.getenv("SPC_STORE")                                 # violation store directory, none by default
+SPC_FLUSH_INTERVAL = 10.0                                           # seconds between two writes of the store
+SPC_MAX_EVENTS = 1_000                                              # latest violations kept in memory
+
+NELSON_RULES = {
+    1: "One point beyond 3 sigma",
+    2: "Nine points in a row on the same side of the center line",
+    3: "Six points in a row steadily increasing or decreasing",
+    4: "Fourteen points in a row alternating up and down",
+    5: "Two out of three points beyond 2 sigma on the same side",
+    6: "Four out of five points beyond 1 sigma on the same side",
+    7: "Fifteen points in a row within 1 sigma",
+    8: "Eight points in a row beyond 1 sigma, on both sides",
+}
+
+TELEMETRY_COLUMNS = [column for _, column in CHARACTERISTICS.values()]
+
+TAIL = 16       # previous points needed to evaluate every rule on a new point and on the one before it
+
+VIOLATION_FIELDS = {
+    "timestamp": "datetime64[s]",
+    "machine_id": np.int16,
+    "part_id": np.int64,
+    "tool_id": np.int16,
+    "measure": np.int8,         # index in CHARACTERISTICS
+    "rule": np.int8,            # key of NELSON_RULES
+    "value": np.float32,
+}
+
+
+def window_count(flags, window):
+    """Number of True flags among each point and the `window - 1` points before it."""
+    counts = np.cumsum(flags, dtype=np.int64)
+    counts[window:] = counts[window:] - counts[:-window]
+    return counts
+
+
+def nelson_rules(values, mean, sigma):
+    """
+    Boolean matrix (8 rules x points) telling which rules hold at each point, i.e. over the points ending there.
+    """
+    z = (values - mean) / sigma
+    above, below = z > 0, z < 0
+    diff = np.diff(values, prepend=np.nan)
+    rising, falling = diff > 0, diff < 0
+    alternating = np.zeros(len(values), dtype=bool)
+    alternating[1:] = (rising[1:] & falling[:-1]) | (falling[1:] & rising[:-1])
+    beyond_1 = np.abs(z) > 1
+
+    return np.stack([
+        np.abs(z) > 3,
+        (window_count(above, 9) == 9) | (window_count(below, 9) == 9),
+        (window_count(rising, 5) == 5) | (window_count(falling, 5) == 5),
+        window_count(alternating, 12) == 12,
+        (window_count(z > 2, 3) >= 2) | (window_count(z < -2, 3) >= 2),
+        (window_count(z > 1, 5) >= 4) | (window_count(z < -1, 5) >= 4),
+        window_count(np.abs(z) < 1, 15) == 15,
+        (window_count(beyond_1, 8) == 8) & (window_count(z > 1, 8) > 0) & (window_count(z < -1, 8) > 0),
+    ])
+
+
+class ControlChart:
+    """
+    Nelson rules on one characteristic of one tool, evaluated as the parts arrive.
+    The first SPC_BASELINE_PARTS parts set the center line and sigma (Welford), then each new block
+    is evaluated together with the last TAIL values only: the state never grows with the history.
+    A violation is reported on the part where a rule starts to hold, not on every part it keeps holding.
+    """
+    def __init__(self, baseline_parts=SPC_BASELINE_PARTS):
+        self.baseline_parts = baseline_parts
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sigma = None
+        self.tail = np.zeros(0)
+
+    def _calibrate(self, values):
+        for value in values:
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+        if self.count >= self.baseline_parts:
+            self.sigma = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def update(self, values):
+        """
+        Rules starting to hold on each of the new values, as a boolean matrix (8 rules x values).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        starts = np.zeros((len(NELSON_RULES), len(values)), dtype=bool)
+        if self.sigma is None:
+            calibration = min(self.baseline_parts - self.count, len(values))
+            self._calibrate(values[:calibration])
+            if self.sigma is None:
+                return starts
+            self.tail = values[max(calibration - TAIL, 0):calibration]
+            starts[:, calibration:] = self.update(values[calibration:])
+            return starts
+        if not self.sigma > 0:      # constant baseline, no sigma to compare with
+            return starts
+
+        points = np.concatenate([self.tail, values])
+        holds = nelson_rules(points, self.mean, self.sigma)
+        previous = np.zeros_like(holds)
+        previous[:, 1:] = holds[:, :-1]
+        starts = (holds & ~previous)[:, len(self.tail):]
+        self.tail = points[-TAIL:]
+        return starts
+
+
+class SpcMonitor:
+    """
+    ControlChart of every tool and characteristic, fed by the telemetry buffer.
+    Violations are kept in memory (latest SPC_MAX_EVENTS) and appended to an optional store.
+    """
+    def __init__(self, store=None):
+        self.charts = {}
+        self.store = store
+        self.flushed_at = time.monotonic()
+        self.events = {name: np.zeros(0, dtype=dtype) for name, dtype in VIOLATION_FIELDS.items()}
+        self.counts = np.zeros(len(NELSON_RULES) + 1, dtype=np.int64)      # indexed by rule
+
+    @classmethod
+    def follow(cls, buffer, store=None):
+        """Rules evaluated on the rows of a TelemetryBuffer, as they are appended."""
+        monitor = cls(store)
+        monitor.update(buffer.latest())
+        buffer.listeners.append(monitor.update)
+        return monitor
+
+    def update(self, block):
+        is_part = block["tool_id"] > 0
+        if not is_part.any():
+            return
+        parts = {name: np.asarray(block[name])[is_part] for name in block}
+
+        violations = []
+        tool_ids = parts["tool_id"]
+        for tool in np.unique(tool_ids):
+            selected = np.flatnonzero(tool_ids == tool)
+            for measure, column in enumerate(CHARACTERISTICS):
+                chart = self.charts.setdefault((int(tool), measure), ControlChart())
+                rules, rows = np.nonzero(chart.update(parts[column][selected]))
+                if len(rows):
+                    rows = selected[rows]
+                    violations.append({
+                        "timestamp": parts["timestamp"][rows],
+                        "machine_id": parts["machine_id"][rows],
+                        "part_id": parts["part_id"][rows],
+                        "tool_id": parts["tool_id"][rows],
+                        "measure": np.full(len(rows), measure),
+                        "rule": rules + 1,
+                        "value": parts[column][rows],
+                    })
+        if violations:
+            self._record({
+                name: np.concatenate([event[name] for event in violations]).astype(dtype)
+                for name, dtype in VIOLATION_FIELDS.items()
+            })
+        if self.store is not None and time.monotonic() - self.flushed_at > SPC_FLUSH_INTERVAL:
+            self.store.flush()
+            self.flushed_at = time.monotonic()
+
+    def _record(self, events):
+        order = np.argsort(events["timestamp"], kind="stable")
+        events = {name: column[order] for name, column in events.items()}
+        self.counts += np.bincount(events["rule"], minlength=len(self.counts))
+        self.events = {
+            name: np.concatenate([self.events[name], events[name]])[-SPC_MAX_EVENTS:] for name in VIOLATION_FIELDS
+        }
+        if self.store is not None:
+            self.store.append(events)
+
+    def to_frame(self, n=None):
+        """Latest `n` violations, newest first."""
+        start = 0 if n is None else max(len(self.events["timestamp"]) - n, 0)
+        events = {name: column[start:][::-1] for name, column in self.events.items()}
+        return pd.DataFrame({
+            "Timestamp": events["timestamp"].astype("datetime64[ns]"),
+            "Machine ID": events["machine_id"],
+            "Part ID": events["part_id"],
+            "Tool ID": events["tool_id"],
+            "Characteristic": [TELEMETRY_COLUMNS[measure] for measure in events["measure"]],
+            "Rule": events["rule"],
+            "Description": [NELSON_RULES[rule] for rule in events["rule"]],
+            "Value": events["value"].astype(np.float64).round(4),
+        })
+
+    def summary(self):
+        """Number of violations per rule since the start."""
+        return {f"rule_{rule}": int(self.counts[rule]) for rule in NELSON_RULES}
+
+
+def violation_store(root=SPC_STORE):
+    """Append-only store of the violations, None when no directory is configured."""
+    return TelemetryStore(root, fields=VIOLATION_FIELDS, batch_rows=SPC_MAX_EVENTS) if root else None
@@ -1,51 +1,291 @@
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import os
 
 import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
 
+from src.production.specs import CHARACTERISTICS, SPEC_PRODUCT, capability, registry
 
-def stats_metrics(data, column, usl, lsl):
-    rolling_mean = data[column].expanding().mean()
-    rolling_std = data[column].expanding().std()
-    cp = (usl - lsl) / (6 * rolling_std)
-    cpk = np.minimum(
-        (usl - rolling_mean) / (3 * rolling_std),
-        (rolling_mean - lsl) / (3 * rolling_std)
-    )
-    cpk[rolling_std == 0] = 0
-    return rolling_mean, rolling_std, cp, cpk
-
-def process_unique_tool(tool, tool_data):
-    tool_data['pos_rolling_mean'], tool_data['pos_rolling_std'], tool_data['pos_rolling_cp'], tool_data['pos_rolling_cpk'] = stats_metrics(tool_data, 'Position', 0.5, 0.3)
-    tool_data['ori_rolling_mean'], tool_data['ori_rolling_std'], tool_data['ori_rolling_cp'], tool_data['ori_rolling_cpk'] = stats_metrics(tool_data, 'Orientation', 0.6, 0.2)
-    return tool, tool_data
-
-async def tools_metrics(raw_data):
-    filtered_data = raw_data[raw_data['Tool ID'] != 'N/A']
-    tools = filtered_data['Tool ID'].unique()
-
-    loop = asyncio.get_running_loop()
-    metrics = {}
-
-    with ThreadPoolExecutor() as executor:
-        tasks = [
-            loop.run_in_executor(
-                executor,
-                process_unique_tool,
-                tool,
-                filtered_data[filtered_data['Tool ID'] == tool].copy()
-            )
-            for tool in tools
-        ]
-
-        results = await asyncio.gather(*tasks)
-
-    for tool, tool_data in results:
-        metrics[f"tool_{tool}"] = tool_data
-
-    all_tools_data = filtered_data.copy()
-    all_tools_data['pos_rolling_mean'], all_tools_data['pos_rolling_std'], all_tools_data['pos_rolling_cp'], all_tools_data['pos_rolling_cpk'] = stats_metrics(all_tools_data, 'Position', 0.5, 0.3)
-    all_tools_data['ori_rolling_mean'], all_tools_data['ori_rolling_std'], all_tools_data['ori_rolling_cp'], all_tools_data['ori_rolling_cpk'] = stats_metrics(all_tools_data, 'Orientation', 0.6, 0.2)
-    metrics['all'] = all_tools_data
-
-    return metrics
\ No newline at end of file
+STATS = ["mean", "std", "cp", "cpk"]
+
+CAPABILITY_WINDOW_PARTS = int(os.getenv("CAPABILITY_WINDOW_PARTS", 50))           # "window": last N parts
+CAPABILITY_WINDOW_MINUTES = float(os.getenv("CAPABILITY_WINDOW_MINUTES", 15))     # "recent": last T minutes
+CAPABILITY_EWMA_ALPHA = float(os.getenv("CAPABILITY_EWMA_ALPHA", 0.1))            # "ewma": weight of the newest part
+CAPABILITY_METHODS = ["rolling", "window", "recent", "ewma"]                      # "rolling" is since the start
+CAPABILITY_DISPLAY = os.getenv("CAPABILITY_DISPLAY", "rolling")                   # method shown by the tool gauges
+CONTROL_CHART_PARTS = int(os.getenv("CONTROL_CHART_PARTS", 200_000))              # latest parts kept per history, for the charts
+
+HISTORY_FIELDS = {
+    # per part
+    "timestamp": "datetime64[s]",
+    "tool_id": np.int16,
+    # per part and characteristic (columns ordered like CHARACTERISTICS)
+    "values": np.float32,
+    **{f"rolling_{stat}": np.float32 for stat in STATS},
+    "sum": np.float64,                  # running sums of (value - spec center),
+    "sum2": np.float64,                 # and of its square, for the windows
+    "ewma_mean": np.float32,
+    "ewma_std": np.float32,
+}
+PART_FIELDS = ["timestamp", "tool_id"]
+
+
+def measures(parts):
+    """Parts x characteristics matrix from storage columns."""
+    return np.column_stack([np.asarray(parts[name], dtype=np.float64) for name in CHARACTERISTICS])
+
+
+def metric_columns(method, mean, std, cp, cpk):
+    """Named "<prefix>_<method>_<stat>" columns from parts x characteristics matrices."""
+    columns = {}
+    for j, (prefix, _) in enumerate(CHARACTERISTICS.values()):
+        for stat, matrix in zip(STATS, [mean, std, cp, cpk]):
+            columns[f"{prefix}_{method}_{stat}"] = matrix[:, j]
+    return columns
+
+
+class CapabilityHistory:
+    """
+    Mean, std, Cp and Cpk of every characteristic of the parts of one tool (or of all tools), after each part:
+    - rolling: since the start, with Welford's online algorithm;
+    - window / recent: over the last CAPABILITY_WINDOW_PARTS parts / CAPABILITY_WINDOW_MINUTES minutes,
+      from differences of running sums, so no part ever has to be evicted;
+    - ewma: exponentially weighted with CAPABILITY_EWMA_ALPHA.
+    Every update costs O(1) per part and is computed on parts x characteristics matrices.
+    The values of the latest `keep` parts are kept in columns for the charts and the windows, in arrival
+    order: the columns grow up to twice `keep` rows, then the oldest parts are discarded, so the memory
+    stays flat however long the run. The running statistics need no rows.
+    Parts may arrive late (replay, ingestion): the "recent" window then selects parts by timestamp.
+    """
+    def __init__(self, lsl, usl, capacity=1024, keep=CONTROL_CHART_PARTS, window_parts=CAPABILITY_WINDOW_PARTS,
+                 window_minutes=CAPABILITY_WINDOW_MINUTES, alpha=CAPABILITY_EWMA_ALPHA):
+        self.lsl = np.asarray(lsl, dtype=np.float64)
+        self.usl = np.asarray(usl, dtype=np.float64)
+        self.center = (self.lsl + self.usl) / 2
+        self.window_parts = window_parts
+        self.window = np.timedelta64(int(window_minutes * 60), 's')
+        self.alpha = alpha
+        k = len(CHARACTERISTICS)
+        self.count = 0
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.sums = np.zeros(k)
+        self.sums2 = np.zeros(k)
+        self.ewma_mean = np.zeros(k)
+        self.ewma_var = np.zeros(k)
+        self.keep = max(keep, window_parts, 1)
+        self.size = 0               # parts in the columns
+        self.dropped = 0            # oldest parts discarded from the columns
+        self.ordered = True         # timestamps of the columns non-decreasing
+        capacity = min(capacity, 2 * self.keep)
+        self.columns = {
+            name: np.zeros(capacity if name in PART_FIELDS else (capacity, k), dtype=dtype)
+            for name, dtype in HISTORY_FIELDS.items()
+        }
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, added):
+        """Room for `added` (at most `keep`) more parts, discarding the oldest beyond the latest `keep`."""
+        if self.size + added > 2 * self.keep:
+            discard = self.size + added - self.keep
+            for column in self.columns.values():
+                column[:self.size - discard] = column[discard:self.size]
+            self.size -= discard
+            self.dropped += discard
+            if not self.ordered:        # the late parts may have been discarded
+                timestamps = self.columns["timestamp"][:self.size]
+                self.ordered = bool((timestamps[1:] >= timestamps[:-1]).all())
+        capacity = len(self.columns["timestamp"])
+        if self.size + added > capacity:
+            capacity = min(max(self.size + added, 2 * capacity), 2 * self.keep)
+            for name, column in self.columns.items():
+                grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                self.columns[name] = grown
+
+    def update(self, parts):
+        """
+        Add a block of part rows. The block is folded in with Chan's update (rolling) and linear
+        filters (ewma), which give the same running values as stepping through the parts one by one.
+        """
+        k = len(parts["timestamp"])
+        if k == 0:
+            return
+        if k > self.keep:
+            for start in range(0, k, self.keep):
+                self.update({name: column[start:start + self.keep] for name, column in parts.items()})
+            return
+        self._reserve(k)
+        start, stop = self.size, self.size + k
+        timestamps = np.asarray(parts["timestamp"], dtype="datetime64[s]")
+        if self.ordered and (
+            (start > 0 and timestamps[0] < self.columns["timestamp"][start - 1]) or (timestamps[1:] < timestamps[:-1]).any()
+        ):
+            self.ordered = False
+        values = measures(parts)
+        self.columns["timestamp"][start:stop] = parts["timestamp"]
+        self.columns["tool_id"][start:stop] = parts["tool_id"]
+        self.columns["values"][start:stop] = values
+
+        n = (self.count + np.arange(1, k + 1))[:, None]
+        delta = values - self.mean
+        delta_sum = np.cumsum(delta, axis=0)
+        mean = self.mean + delta_sum / n
+        m2 = self.m2 + np.cumsum(delta * delta, axis=0) - delta_sum * delta_sum / n
+        with np.errstate(invalid="ignore"):
+            std = np.where(n > 1, np.sqrt(np.maximum(m2, 0) / (n - 1)), np.nan)
+        cp, cpk = capability(mean, std, self.lsl, self.usl)
+        for stat, matrix in zip(STATS, [mean, std, cp, cpk]):
+            self.columns[f"rolling_{stat}"][start:stop] = matrix
+        self.mean, self.m2 = mean[-1], m2[-1]
+
+        centered = values - self.center        # keeps the running sums small
+        sums = self.sums + np.cumsum(centered, axis=0)
+        sums2 = self.sums2 + np.cumsum(centered * centered, axis=0)
+        self.columns["sum"][start:stop] = sums
+        self.columns["sum2"][start:stop] = sums2
+        self.sums, self.sums2 = sums[-1], sums2[-1]
+
+        # ewma mean[t] = mean[t-1] + alpha (x[t] - mean[t-1])
+        # ewma var[t] = (1 - alpha) (var[t-1] + alpha (x[t] - mean[t-1])^2)
+        alpha = self.alpha
+        if self.count == 0:
+            self.ewma_mean, self.ewma_var = values[0], np.zeros(values.shape[1])
+        means = lfilter([alpha], [1, alpha - 1], values, axis=0, zi=[(1 - alpha) * self.ewma_mean])[0]
+        previous = np.vstack([self.ewma_mean, means[:-1]])
+        variances = lfilter(
+            [(1 - alpha) * alpha], [1, alpha - 1], (values - previous) ** 2, axis=0, zi=[(1 - alpha) * self.ewma_var]
+        )[0]
+        self.columns["ewma_mean"][start:stop] = means
+        self.columns["ewma_std"][start:stop] = np.where(n > 1, np.sqrt(variances), np.nan)
+        self.ewma_mean, self.ewma_var = means[-1], variances[-1]
+
+        self.count += k
+        self.size = stop
+
+    def _windowed(self, rows, first):
+        """
+        Mean and std matrices over the parts [first, row] of each row. Once parts were discarded,
+        the first kept part only serves as the origin of the running sums.
+        """
+        if self.dropped:
+            first = np.maximum(first, 1)
+        sums, sums2 = self.columns["sum"], self.columns["sum2"]
+        before = (first - 1)[:, None]
+        count = (rows[:, None] - before).astype(np.float64)
+        total = sums[rows] - np.where(before >= 0, sums[np.maximum(first - 1, 0)], 0)
+        total2 = sums2[rows] - np.where(before >= 0, sums2[np.maximum(first - 1, 0)], 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = np.maximum(total2 - total * total / count, 0) / (count - 1)
+            std = np.where(count > 1, np.sqrt(variance), np.nan)
+        return total / count + self.center, std
+
+    def _recent(self, rows):
+        """
+        Mean and std matrices over the parts timestamped in the `window` up to each row.
+        In arrival order the window is a range of rows ending at the row, else it is taken in
+        timestamp order among the parts kept, whatever their arrival.
+        """
+        timestamps = self.columns["timestamp"][:self.size]
+        if self.ordered:
+            return self._windowed(rows, np.searchsorted(timestamps, timestamps[rows] - self.window, side="right"))
+
+        ends = timestamps[rows]
+        candidates = np.flatnonzero(timestamps > ends.min() - self.window)
+        candidates = candidates[np.argsort(timestamps[candidates], kind="stable")]
+        ordered = timestamps[candidates]
+        centered = self.columns["values"][candidates].astype(np.float64) - self.center
+        zero = np.zeros((1, centered.shape[1]))
+        sums = np.vstack([zero, np.cumsum(centered, axis=0)])
+        sums2 = np.vstack([zero, np.cumsum(centered * centered, axis=0)])
+        first = np.searchsorted(ordered, ends - self.window, side="right")
+        stop = np.searchsorted(ordered, ends, side="right")
+        count = (stop - first)[:, None].astype(np.float64)
+        total, total2 = sums[stop] - sums[first], sums2[stop] - sums2[first]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = np.maximum(total2 - total * total / count, 0) / (count - 1)
+            std = np.where(count > 1, np.sqrt(variance), np.nan)
+        return total / count + self.center, std
+
+    def latest_values(self, n=None):
+        """Timestamps and values (parts x characteristics) of the latest `n` parts, as views."""
+        start = 0 if n is None else max(self.size - n, 0)
+        return self.columns["timestamp"][start:self.size], self.columns["values"][start:self.size]
+
+    def to_frame(self, n=None):
+        """
+        Latest `n` parts with their values for every method, as expected by ToolMetricsDisplay:
+        columns "<pos|ori>_<rolling|window|recent|ewma>_<mean|std|cp|cpk>".
+        """
+        start = 0 if n is None else max(self.size - n, 0)
+        rows = np.arange(start, self.size)
+        timestamps = self.columns["timestamp"][:self.size]
+
+        values = self.columns["values"][rows]
+        columns = {
+            "Timestamp": timestamps[rows].astype("datetime64[ns]"),
+            "Tool ID": self.columns["tool_id"][rows],
+            **{column: values[:, j] for j, (_, column) in enumerate(CHARACTERISTICS.values())},
+        }
+        columns.update(metric_columns("rolling", *(self.columns[f"rolling_{stat}"][rows] for stat in STATS)))
+        windows = {
+            "window": self._windowed(rows, np.maximum(rows - self.window_parts + 1, 0)),
+            "recent": self._recent(rows),
+        }
+        for method, (mean, std) in windows.items():
+            columns.update(metric_columns(method, mean, std, *capability(mean, std, self.lsl, self.usl)))
+        mean, std = self.columns["ewma_mean"][rows], self.columns["ewma_std"][rows]
+        columns.update(metric_columns("ewma", mean, std, *capability(mean, std, self.lsl, self.usl)))
+        return pd.DataFrame(columns)
+
+
+class ToolsCapability:
+    """
+    CapabilityHistory of every tool and of all tools together, fed by the telemetry buffer.
+    Each tool is evaluated against its own limits in the specification registry, all tools against the product's.
+    """
+    def __init__(self, product=SPEC_PRODUCT):
+        self.product = product
+        self.histories = {"all": CapabilityHistory(*registry.limits(product=product))}
+
+    @classmethod
+    def follow(cls, buffer):
+        """Running capability over the rows of a TelemetryBuffer, kept up to date on every append."""
+        capability = cls()
+        capability.update(buffer.latest())
+        buffer.listeners.append(capability.update)
+        return capability
+
+    def update(self, block):
+        is_part = block["tool_id"] > 0
+        if not is_part.any():
+            return
+        parts = {name: np.asarray(block[name])[is_part] for name in PART_FIELDS + list(CHARACTERISTICS)}
+        self.histories["all"].update(parts)
+
+        tool_ids = parts["tool_id"]
+        for tool in np.unique(tool_ids):
+            selected = tool_ids == tool
+            key = f"tool_{tool}"
+            if key not in self.histories:
+                lsl, usl = registry.limits([tool], self.product)
+                self.histories[key] = CapabilityHistory(lsl[0], usl[0])
+            self.histories[key].update({name: column[selected] for name, column in parts.items()})
+
+    def latest_values(self, key, n=None):
+        """Timestamps and values of the latest `n` parts of a tool ("tool_<id>") or of all tools ("all")."""
+        if key not in self.histories:
+            return np.zeros(0, dtype="datetime64[s]"), np.zeros((0, len(CHARACTERISTICS)))
+        return self.histories[key].latest_values(n)
+
+    def frames(self, n=None, keys=None):
+        """
+        Latest `n` parts of each tool ("tool_<id>") and of all tools ("all") as DataFrames,
+        or of the given `keys` only.
+        """
+        return {
+            key: history.to_frame(n) for key, history in self.histories.items()
+            if len(history) and (keys is None or key in keys)
+        }
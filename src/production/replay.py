@@ -0,0 +1,252 @@
+import asyncio
+import os
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from .buffer import TelemetryBuffer
+from .schema import ERROR_CODES, FIELDS, empty_block
+from .store import TelemetryStore
+
+REPLAY_STEP = 1.0           # real seconds between two replayed batches
+REPLAY_MAX_ROWS = 5_000     # rows per batch when replaying at max speed
+FOLLOW_IDLE = 5.0           # seconds without any session asking for a followed line before its follower pauses
+FOLLOW_SETTLE = 2.0         # seconds a partition directory stays rescanned after its last change (mtime resolution)
+
+TELEMETRY_REPLAY = os.getenv("TELEMETRY_REPLAY")        # CSV file or store directory replayed instead of the simulator
+TELEMETRY_FOLLOW = os.getenv("TELEMETRY_FOLLOW")        # store directory followed live, e.g. fed by the ingestion API
+
+
+def parse_speed(value):
+    """Replay speed from "1x", "10", "max"... None stands for max speed."""
+    value = str(value).strip().lower().rstrip("x")
+    return None if value == "max" else float(value)
+
+
+REPLAY_SPEED = parse_speed(os.getenv("REPLAY_SPEED", "1x"))
+
+
+def load_csv(path):
+    """
+    Telemetry block from a CSV file written by the headless simulator (CsvSink).
+    """
+    df = pd.read_csv(path, na_values=["N/A"], keep_default_na=False)
+    is_part = df["Tool ID"].notna().to_numpy()
+    timestamp = pd.to_datetime(df["Timestamp"], format="%Y-%m-%d %H:%M:%S")
+    downtime = (
+        pd.to_datetime(df["Downtime End"], format="%Y-%m-%d %H:%M:%S")
+        - pd.to_datetime(df["Downtime Start"], format="%Y-%m-%d %H:%M:%S")
+    ).dt.total_seconds()
+
+    block = empty_block(len(df))
+    block["machine_id"][:] = df["Machine ID"].to_numpy() if "Machine ID" in df.columns else 1
+    block["timestamp"] = timestamp.to_numpy().astype("datetime64[s]")
+    block["part_id"][is_part] = df["Part ID"][is_part].astype(np.int64)
+    block["position"][is_part] = df["Position"][is_part]
+    block["orientation"][is_part] = df["Orientation"][is_part]
+    block["tool_id"][is_part] = df["Tool ID"][is_part].astype(np.int16)
+    block["compliance"] = (df["Compliance"] == "OK").to_numpy()
+    block["error_code"] = pd.Categorical(df["Error Code"], categories=ERROR_CODES).codes.astype(np.int8)
+    block["downtime"] = downtime.fillna(0).to_numpy().astype(np.int32)
+    return block
+
+
+class TelemetryReplay:
+    """
+    Plays a recorded telemetry block back on a virtual clock, with pause, seek and speed control.
+    `speed` is the number of recorded seconds played per real second, None for max speed.
+    Exposes the same `clock` / `advance(until)` interface as the simulators.
+    """
+    def __init__(self, block, speed=1.0):
+        order = np.lexsort((block["machine_id"], block["timestamp"]))
+        self.block = {name: np.asarray(block[name])[order] for name in FIELDS}
+        self.timestamps = self.block["timestamp"]
+        self.speed = speed
+        self.paused = False
+        self.cursor = 0
+        self.clock = self.timestamps[0].astype(object) if len(self.timestamps) else None
+        self.rewound = False        # set by seek(), the rows already played are no longer consistent
+
+    @classmethod
+    def from_csv(cls, path, speed=1.0):
+        return cls(load_csv(path), speed=speed)
+
+    @classmethod
+    def from_store(cls, store, start=None, end=None, speed=1.0):
+        store = store if isinstance(store, TelemetryStore) else TelemetryStore(store)
+        return cls(store.read_block(start, end), speed=speed)
+
+    @classmethod
+    def from_path(cls, path, speed=1.0):
+        """A CSV file or a telemetry store directory."""
+        return cls.from_store(path, speed=speed) if os.path.isdir(path) else cls.from_csv(path, speed=speed)
+
+    @property
+    def tools_count(self):
+        return int(self.block["tool_id"].max(initial=0))
+
+    @property
+    def part_id(self):
+        return int(self.block["part_id"][:self.cursor].max(initial=-1)) + 1
+
+    @property
+    def finished(self):
+        return self.cursor >= len(self.timestamps)
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def seek(self, when):
+        """Move the clock to `when`: the next rows played are the ones recorded from then on."""
+        self.cursor = int(np.searchsorted(self.timestamps, np.datetime64(when, 's'), side="left"))
+        self.clock = pd.Timestamp(when).to_pydatetime()
+        self.rewound = True
+
+    def _take(self, stop):
+        block = {name: column[self.cursor:stop] for name, column in self.block.items()}
+        self.cursor = stop
+        return block
+
+    def advance(self, until):
+        """All remaining rows recorded before `until`, none for an empty recording."""
+        stop = int(np.searchsorted(self.timestamps, np.datetime64(until, 's'), side="left"))
+        self.clock = until if self.clock is None else max(self.clock, until)
+        return self._take(max(stop, self.cursor))
+
+    def advance_rows(self, rows):
+        """The next `rows` rows, whatever their timestamps."""
+        block = self._take(min(self.cursor + rows, len(self.timestamps)))
+        if len(block["timestamp"]):
+            self.clock = max(self.clock, block["timestamp"][-1].astype(object) + timedelta(seconds=1))
+        return block
+
+
+async def replay_data(state):
+    """
+    Feed `state['data']['replay']` into the session buffer, like generate_data does with the simulator.
+    """
+    replay = state['data']['replay']
+    buffer = state['data'].setdefault('buffer', TelemetryBuffer(tools_count=replay.tools_count))
+
+    while state["running"] and not replay.finished:
+        if replay.rewound:
+            buffer = state['data']['buffer'] = TelemetryBuffer(buffer.capacity, tools_count=buffer.tools_count)
+            replay.rewound = False
+        if replay.paused:
+            await asyncio.sleep(REPLAY_STEP)
+            continue
+
+        if replay.speed is None:
+            block = replay.advance_rows(REPLAY_MAX_ROWS)
+        else:
+            block = replay.advance(replay.clock + timedelta(seconds=REPLAY_STEP * replay.speed))
+        buffer.append(block)
+
+        await asyncio.sleep(0 if replay.speed is None else REPLAY_STEP)
+
+    state["date"] = replay.clock
+    state["part_id"] = replay.part_id
+
+
+class StoreFollower:
+    """
+    Follows a telemetry store written by another process (e.g. the ingestion API).
+    The store is append-only and each writer numbers its files, so the follower keeps, per partition,
+    the last sequence read of every writer: a poll only lists the partitions changed since the previous
+    one and reads the files numbered past these high-water marks.
+    """
+    def __init__(self, store):
+        self.store = store if isinstance(store, TelemetryStore) else TelemetryStore(store)
+        self.marks = {}         # partition directory -> (mtime when listed, {writer id: last sequence read})
+        self.clock = None
+        self.max_part_id = -1
+        self.max_tool_id = 0
+
+    @property
+    def tools_count(self):
+        return self.max_tool_id
+
+    @property
+    def part_id(self):
+        return self.max_part_id + 1
+
+    def _new_files(self):
+        """Paths of the files completed since the last poll, advancing the high-water marks."""
+        paths = []
+        suffix = f".{self.store.file_format}"
+        for directory in self.store.partitions():
+            mtime = os.stat(directory).st_mtime_ns
+            listed, marks = self.marks.get(directory, (None, {}))
+            if mtime == listed:
+                continue
+            writers = dict(marks)
+            for name in os.listdir(directory):
+                if name.startswith(".") or not name.endswith(suffix):
+                    continue
+                writer, sequence = name[:-len(suffix)].removeprefix("part-").rsplit("-", 1)
+                if int(sequence) > marks.get(writer, -1):
+                    paths.append(os.path.join(directory, name))
+                    writers[writer] = max(writers.get(writer, -1), int(sequence))
+            # a file renamed within the mtime resolution of the listing would not change it: list again
+            settled = time.time_ns() - mtime > FOLLOW_SETTLE * 1e9
+            self.marks[directory] = (mtime if settled else None, writers)
+        return sorted(paths)
+
+    def poll(self):
+        """Rows of the files written since the last poll."""
+        block = self.store.read_files(self._new_files())
+        if len(block["timestamp"]):
+            self.clock = block["timestamp"][-1].astype(object)
+            self.max_part_id = max(self.max_part_id, int(block["part_id"].max()))
+            self.max_tool_id = max(self.max_tool_id, int(block["tool_id"].max()))
+        return block
+
+
+async def follow_data(state):
+    """
+    Feed the rows landing in `state['data']['follower']`'s store into the state's buffer,
+    until no session attached to the state for FOLLOW_IDLE seconds (see shared_line).
+    """
+    follower = state['data']['follower']
+    buffer = state['data'].setdefault('buffer', TelemetryBuffer(tools_count=follower.tools_count))
+
+    while state["running"] and time.monotonic() - state.get("attached", time.monotonic()) < FOLLOW_IDLE:
+        block = await asyncio.to_thread(follower.poll)
+        buffer.tools_count = max(buffer.tools_count, follower.tools_count)
+        buffer.append(block)
+        await asyncio.sleep(REPLAY_STEP)
+
+    if follower.clock is not None:
+        state["date"] = follower.clock
+    state["part_id"] = follower.part_id
+
+
+LINES = {}      # store directory -> line state followed by every session, see shared_line
+
+
+def shared_line(root):
+    """
+    State of the line written to a store, shared by all the sessions following it: one follower,
+    one buffer and one polling task, however many dashboards are open.
+    Running sessions attach by asking for the line at every pipeline step: once none did for FOLLOW_IDLE
+    seconds, the polling task ends, and the next session asking resumes it where the follower stopped.
+    """
+    if root not in LINES:
+        follower = StoreFollower(root)
+        LINES[root] = {
+            "running": True,
+            "date": None,
+            "part_id": 0,
+            "data": {"follower": follower, "buffer": TelemetryBuffer(tools_count=follower.tools_count)},
+            "task": None,
+        }
+    line = LINES[root]
+    line["attached"] = time.monotonic()
+    if line["task"] is None or line["task"].done():
+        line["task"] = asyncio.create_task(follow_data(line))
+    return line
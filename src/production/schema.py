@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from .downtime import machine_errors
+
+COLUMNS = [
+    "Machine ID", "Part ID", "Timestamp", "Position", "Orientation", "Tool ID",
+    "Compliance", "Event", "Error Code", "Error Description",
+    "Downtime Start", "Downtime End"
+]
+
+# Storage layout of a telemetry block, as produced by the generator and kept by the buffer
+FIELDS = {
+    "machine_id": np.int16,
+    "part_id": np.int64,                # -1 when the row is a machine error, numbered per machine
+    "timestamp": "datetime64[s]",
+    "position": np.float32,             # NaN when the row is a machine error
+    "orientation": np.float32,
+    "tool_id": np.int16,                # fleet-wide tool ID, 0 when the row is a machine error
+    "compliance": np.bool_,
+    "error_code": np.int8,              # index in ERROR_CODES, -1 when no error
+    "downtime": np.int32,               # seconds
+}
+
+ERROR_CODES = np.array(list(machine_errors.keys()), dtype=object)
+ERROR_DESCRIPTIONS = np.array([error["description"] for error in machine_errors.values()], dtype=object)
+
+COMPLIANCE_DTYPE = pd.CategoricalDtype(["OK", "NOK"])
+EVENT_DTYPE = pd.CategoricalDtype(["Machine Error"])
+ERROR_CODE_DTYPE = pd.CategoricalDtype(ERROR_CODES)
+ERROR_DESCRIPTION_DTYPE = pd.CategoricalDtype(ERROR_DESCRIPTIONS)
+
+
+def tool_dtype(tools_count):
+    return pd.CategoricalDtype(range(1, tools_count + 1))
+
+
+def empty_block(size):
+    """
+    Storage columns for `size` rows, filled with the null sentinels of FIELDS.
+    """
+    return {
+        "machine_id": np.zeros(size, dtype=np.int16),
+        "part_id": np.full(size, -1, dtype=np.int64),
+        "timestamp": np.zeros(size, dtype="datetime64[s]"),
+        "position": np.full(size, np.nan, dtype=np.float32),
+        "orientation": np.full(size, np.nan, dtype=np.float32),
+        "tool_id": np.zeros(size, dtype=np.int16),
+        "compliance": np.zeros(size, dtype=np.bool_),
+        "error_code": np.full(size, -1, dtype=np.int8),
+        "downtime": np.zeros(size, dtype=np.int32),
+    }
+
+
+def to_frame(rows, tools_count):
+    """
+    Typed telemetry DataFrame from storage columns.
+    Timestamps are datetime64, measurements float32, tools, compliance and errors categorical,
+    and missing values are nulls instead of "N/A" strings.
+    """
+    is_part = rows["tool_id"] > 0
+    is_error = rows["error_code"] >= 0
+    codes = rows["error_code"].astype(np.int64)
+
+    timestamp = rows["timestamp"].astype("datetime64[ns]")
+    downtime = rows["downtime"].astype("timedelta64[s]").astype("timedelta64[ns]")
+    not_a_time = np.datetime64("NaT", "ns")
+
+    return pd.DataFrame({
+        "Machine ID": rows["machine_id"],
+        "Part ID": pd.arrays.IntegerArray(rows["part_id"].astype(np.int64), mask=~is_part),
+        "Timestamp": timestamp,
+        "Position": rows["position"],
+        "Orientation": rows["orientation"],
+        "Tool ID": pd.Categorical.from_codes(rows["tool_id"].astype(np.int64) - 1, dtype=tool_dtype(tools_count)),
+        "Compliance": pd.Categorical.from_codes(
+            np.where(is_part, np.where(rows["compliance"], 0, 1), -1), dtype=COMPLIANCE_DTYPE
+        ),
+        "Event": pd.Categorical.from_codes(np.where(is_error, 0, -1), dtype=EVENT_DTYPE),
+        "Error Code": pd.Categorical.from_codes(codes, dtype=ERROR_CODE_DTYPE),
+        "Error Description": pd.Categorical.from_codes(codes, dtype=ERROR_DESCRIPTION_DTYPE),
+        "Downtime Start": np.where(is_error, timestamp, not_a_time),
+        "Downtime End": np.where(is_error, timestamp + downtime, not_a_time),
+    }, columns=COLUMNS)
+
+
+def merge_blocks(blocks):
+    """
+    Single block from several sources (e.g. machines), ordered by timestamp then machine ID.
+    """
+    blocks = [block for block in blocks if len(block["timestamp"])]
+    if not blocks:
+        return empty_block(0)
+    if len(blocks) == 1:
+        return blocks[0]
+    merged = {name: np.concatenate([block[name] for block in blocks]) for name in FIELDS}
+    order = np.lexsort((merged["machine_id"], merged["timestamp"]))
+    return {name: column[order] for name, column in merged.items()}
+
+
+def empty_frame(tools_count):
+    return to_frame(empty_block(0), tools_count)
+
+
+def format_frame(df):
+    """
+    String copy of a telemetry frame for display and JSON export, with "N/A" for missing values.
+    """
+    formatted = pd.DataFrame(index=df.index)
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime("%Y-%m-%d %H:%M:%S")
+        elif pd.api.types.is_float_dtype(values):
+            values = values.astype(np.float64).round(4)
+        formatted[column] = values.astype(object).where(values.notna(), "N/A")
+    return formatted
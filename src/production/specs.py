@@ -0,0 +1,101 @@
+import json
+import os
+
+import numpy as np
+
+CHARACTERISTICS = {
+    # storage column: (prefix of the metric columns, telemetry column)
+    "position": ("pos", "Position"),
+    "orientation": ("ori", "Orientation"),
+}
+
+DEFAULT_LIMITS = {
+    # characteristic: (lsl, usl)
+    "position": (0.3, 0.5),
+    "orientation": (0.2, 0.6),
+}
+
+DEFAULT_PRODUCT = "default"
+SPEC_FILE = os.getenv("SPEC_FILE")                          # JSON registry, see SpecRegistry.from_json
+SPEC_PRODUCT = os.getenv("SPEC_PRODUCT", DEFAULT_PRODUCT)   # product made by the machines
+
+
+def capability(mean, std, lsl, usl):
+    """
+    Cp and Cpk for any shape of mean and std (e.g. parts x characteristics), limits broadcasting
+    against them. Cpk is 0 when std is 0.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cp = (usl - lsl) / (6 * std)
+        cpk = np.minimum(usl - mean, mean - lsl) / (3 * std)
+    cpk = np.where(std == 0, 0, cpk)
+    return cp, cpk
+
+
+class SpecRegistry:
+    """
+    Specification limits of every characteristic, per product, with optional overrides per tool.
+    Limits are resolved into (tools x characteristics) tables once per product, so the limits of
+    a block of parts are a single fancy-indexing lookup.
+    """
+    def __init__(self, limits=None, products=None):
+        self.characteristics = list(CHARACTERISTICS)
+        self.products = {DEFAULT_PRODUCT: {"limits": dict(DEFAULT_LIMITS, **(limits or {})), "tools": {}}}
+        for name, product in (products or {}).items():
+            self.products[name] = {
+                "limits": dict(self.products[DEFAULT_PRODUCT]["limits"], **product.get("limits", {})),
+                "tools": {int(tool): overrides for tool, overrides in product.get("tools", {}).items()},
+            }
+        self.tables = {}
+
+    @classmethod
+    def from_json(cls, path):
+        """
+        Registry from a JSON file such as
+        {"limits": {"position": [0.3, 0.5]},
+         "products": {"bracket": {"limits": {"orientation": [0.25, 0.55]}, "tools": {"2": {"position": [0.32, 0.48]}}}}}
+        Limits are [lsl, usl]; what a product or tool does not set is inherited.
+        """
+        with open(path) as f:
+            registry = json.load(f)
+        return cls(registry.get("limits"), registry.get("products"))
+
+    def _table(self, product):
+        if product not in self.tables:
+            spec = self.products[product]
+            tools = max(spec["tools"], default=0)
+            table = np.tile(np.array([spec["limits"][name] for name in self.characteristics], dtype=np.float64),
+                            (tools + 1, 1, 1))
+            for tool, overrides in spec["tools"].items():
+                for column, name in enumerate(self.characteristics):
+                    if name in overrides:
+                        table[tool, column] = overrides[name]
+            self.tables[product] = table        # tools x characteristics x (lsl, usl)
+        return self.tables[product]
+
+    def limits(self, tool_ids=None, product=SPEC_PRODUCT):
+        """
+        (lsl, usl) arrays: per characteristic for the product, or per part and characteristic
+        when the parts' `tool_ids` are given.
+        """
+        table = self._table(product)
+        if tool_ids is None:
+            return table[0, :, 0], table[0, :, 1]
+        rows = np.asarray(tool_ids, dtype=np.int64)
+        rows = np.where(rows < len(table), rows, 0)         # tools without overrides use the product limits
+        selected = table[rows]
+        return selected[..., 0], selected[..., 1]
+
+    def spec(self, tool_id=None, product=SPEC_PRODUCT):
+        """{characteristic: (lsl, usl)} of a tool, or of the product when no tool is given."""
+        lsl, usl = self.limits(None if tool_id is None else [tool_id], product)
+        lsl, usl = np.ravel(lsl), np.ravel(usl)
+        return {name: (float(lsl[j]), float(usl[j])) for j, name in enumerate(self.characteristics)}
+
+    def compliance(self, values, tool_ids=None, product=SPEC_PRODUCT):
+        """Whether each part (row of `values`, one column per characteristic) is within all its limits."""
+        lsl, usl = self.limits(tool_ids, product)
+        return np.all((lsl <= values) & (values <= usl), axis=-1)
+
+
+registry = SpecRegistry.from_json(SPEC_FILE) if SPEC_FILE else SpecRegistry()
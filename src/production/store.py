@@ -0,0 +1,136 @@
+import os
+import uuid
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from .schema import FIELDS, empty_block, to_frame
+
+STORE_DIR = os.getenv("TELEMETRY_STORE", "./data/telemetry")
+STORE_BATCH_ROWS = 50_000
+
+PARTITION_UNITS = {"day": "D", "hour": "h"}
+FILE_FORMATS = {"parquet": "parquet", "arrow": "ipc"}
+
+
+class TelemetryStore:
+    """
+    Append-only telemetry store made of time-partitioned Parquet (or Arrow IPC) files.
+    Blocks are buffered in memory and written in batches, one new file per partition and flush,
+    under `root/partition=<day or hour>/`. Files are never rewritten.
+    Rows are telemetry (schema.FIELDS) unless other timestamped `fields` are given, e.g. SPC violations.
+    """
+    def __init__(self, root=STORE_DIR, partition="day", file_format="parquet", batch_rows=STORE_BATCH_ROWS,
+                 fields=FIELDS):
+        self.root = root
+        self.fields = fields
+        self.unit = PARTITION_UNITS[partition]
+        self.file_format = file_format
+        self.batch_rows = batch_rows
+        self.writer_id = uuid.uuid4().hex[:8]
+        self.sequence = 0
+        self.pending = []
+        self.pending_rows = 0
+
+    def append(self, block):
+        size = len(block["timestamp"])
+        if size == 0:
+            return
+        self.pending.append({name: np.array(block[name]) for name in self.fields})
+        self.pending_rows += size
+        if self.pending_rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the pending rows, one file per partition.
+        """
+        if not self.pending:
+            return
+        rows = {name: np.concatenate([block[name] for block in self.pending]) for name in self.fields}
+        self.pending, self.pending_rows = [], 0
+
+        keys = np.datetime_as_string(rows["timestamp"], unit=self.unit)
+        for key in np.unique(keys):
+            selected = keys == key
+            table = pa.table({name: column[selected] for name, column in rows.items()})
+            directory = os.path.join(self.root, f"partition={key}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{self.writer_id}-{self.sequence:06d}.{self.file_format}")
+            temporary = os.path.join(directory, f".{os.path.basename(path)}")   # hidden from readers until complete
+            if self.file_format == "parquet":
+                pq.write_table(table, temporary)
+            else:
+                feather.write_feather(table, temporary, compression="uncompressed")
+            os.replace(temporary, path)
+        self.sequence += 1
+
+    def close(self):
+        self.flush()
+
+    def dataset(self):
+        return ds.dataset(
+            self.root,
+            format=FILE_FORMATS[self.file_format],
+            partitioning=ds.partitioning(pa.schema([("partition", pa.string())]), flavor="hive"),
+        )
+
+    def _empty(self, columns):
+        if self.fields is FIELDS:
+            return {name: column for name, column in empty_block(0).items() if name in columns}
+        return {name: np.zeros(0, dtype=self.fields[name]) for name in columns}
+
+    def partitions(self):
+        """Directories of the partitions of the store, sorted."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(entry.path for entry in os.scandir(self.root) if entry.is_dir())
+
+    def read_files(self, paths):
+        """Rows of the given store files as a dict of NumPy columns, sorted by timestamp."""
+        if not paths:
+            return self._empty(self.fields)
+        table = ds.dataset(paths, format=FILE_FORMATS[self.file_format]).to_table(columns=list(self.fields))
+        table = table.sort_by([("timestamp", "ascending"), ("machine_id", "ascending")])
+        return {name: table.column(name).to_numpy().astype(dtype, copy=False) for name, dtype in self.fields.items()}
+
+    def read_block(self, start=None, end=None, columns=None, filter=None):
+        """
+        Rows timestamped in [start, end) as a dict of NumPy columns.
+        Only the partitions overlapping the range and the requested `columns` are read; `filter` is an
+        optional pyarrow.dataset expression (e.g. `ds.field("tool_id") == 1`) pushed down to the scan.
+        """
+        columns = list(columns) if columns else list(self.fields)
+        if not os.path.isdir(self.root):
+            return self._empty(columns)
+
+        expression = ds.scalar(True)
+        if start is not None:
+            start = np.datetime64(start, 's')
+            expression &= ds.field("partition") >= np.datetime_as_string(start, unit=self.unit)
+            expression &= ds.field("timestamp") >= pa.scalar(start, type=pa.timestamp("s"))
+        if end is not None:
+            end = np.datetime64(end, 's')
+            expression &= ds.field("partition") <= np.datetime_as_string(end, unit=self.unit)
+            expression &= ds.field("timestamp") < pa.scalar(end, type=pa.timestamp("s"))
+        if filter is not None:
+            expression &= filter
+
+        table = self.dataset().to_table(columns=columns, filter=expression)
+        table = table.sort_by([(name, "ascending") for name in ["timestamp", "machine_id"] if name in columns])
+        return {
+            name: table.column(name).to_numpy().astype(self.fields[name], copy=False)
+            for name in columns
+        }
+
+    def read_frame(self, start=None, end=None, tools_count=None, filter=None):
+        """
+        Rows timestamped in [start, end) as a typed telemetry DataFrame (see schema.to_frame).
+        """
+        block = self.read_block(start, end, filter=filter)
+        if tools_count is None:
+            tools_count = int(block["tool_id"].max(initial=0))
+        return to_frame(block, tools_count)
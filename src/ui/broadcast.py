@@ -0,0 +1,191 @@
+import asyncio
+import json
+import threading
+import weakref
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from src.production.flow import TOOLS_COUNT
+from src.production.metrics.downtimes import DowntimeLog
+from src.production.metrics.machine import MachineMetrics
+from src.production.metrics.rollup import Rollups
+from src.production.metrics.spc import SpcMonitor, violation_store
+from src.production.metrics.tools import ToolsCapability, CAPABILITY_METHODS, CONTROL_CHART_PARTS
+from src.production.schema import format_frame
+
+MAX_ROWS = 1000
+MAX_VIOLATIONS = 100
+MAX_DOWNTIMES = 100
+
+TOOLS = [f'tool_{i}' for i in range(1, TOOLS_COUNT + 1)] + ['all']
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    What a dashboard tick shows for one data version, built once and read by every session
+    watching the same buffer. Never modified after creation.
+    """
+    version: int = -1                                   # rows appended to the buffer when it was computed
+    tools: dict = field(default_factory=dict)           # tool frames, keyed like TOOLS
+    pareto: pd.DataFrame = field(default_factory=pd.DataFrame)
+    status: dict = field(default_factory=dict)
+    plots: tuple = ()                                   # figures, tool plots then general plots
+
+
+def stream_of(tool):
+    """Buffer stream of a tool key, None for all tools."""
+    return None if tool == 'all' else int(tool.split('_')[1])
+
+
+def build_plots(displays, tools, pareto, status):
+    """Figures of the dashboard outputs, tool plots then general plots."""
+    tool_plots = []
+    for tool, display in zip(TOOLS[:-1], displays[:-1]):
+        tool_plots.extend(display.refresh(df=tools.get(tool, pd.DataFrame())))
+    return tuple(tool_plots) + general_plots(displays, pareto, status)
+
+
+def general_plots(displays, pareto, status):
+    return tuple(displays[-1].refresh(
+        pareto_df=pareto,
+        status=status
+    ))
+
+
+_empty = {}
+
+def empty_snapshot(displays):
+    """Snapshot shown before any data, built once per set of displays."""
+    if id(displays) not in _empty:
+        _empty[id(displays)] = Snapshot(plots=build_plots(displays, {}, pd.DataFrame(), {}))
+    return _empty[id(displays)]
+
+
+class Broadcast:
+    """
+    Metrics and figures of one telemetry buffer, shared by all the sessions watching it.
+    The running metrics follow the buffer once, and the snapshot is recomputed at most once
+    per data version (the buffer's row count), by the first tick that sees it stale.
+    Within a snapshot, the frames and figures of a tool and the pareto are only rebuilt when
+    the version of their stream changed.
+    The metrics are read on the event loop, where the buffer's listeners update them, and the
+    figures and data/*.json files are built from copies of them in a worker thread.
+    """
+    broadcasts = weakref.WeakKeyDictionary()        # buffer -> Broadcast, dropped with the buffer
+    render_lock = threading.Lock()                  # the displays and their figure caches are shared by all buffers
+
+    def __init__(self, buffer):
+        # the buffer itself is not kept, so that the broadcast goes away with it
+        self.machine = MachineMetrics.follow(buffer)
+        self.capability = ToolsCapability.follow(buffer)
+        self.spc = SpcMonitor.follow(buffer, store=violation_store())
+        self.rollups = Rollups.follow(buffer)
+        self.downtimes = DowntimeLog.follow(buffer)
+        self.snapshot = Snapshot()
+        self.versions = {}          # tool key or 'pareto' -> stream version of its frame and figures
+        self.tool_plots = {}        # tool key -> figures of its display
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    def of(cls, buffer):
+        if buffer not in cls.broadcasts:
+            cls.broadcasts[buffer] = cls(buffer)
+        return cls.broadcasts[buffer]
+
+    async def refresh(self, buffer, displays):
+        """Snapshot of the current data version, computed if no session did it yet."""
+        if self.snapshot.version == buffer.total:
+            return self.snapshot
+        async with self.lock:
+            if self.snapshot.version != buffer.total:       # not computed while waiting for the lock
+                data = self.collect(buffer)
+                self.snapshot = await asyncio.to_thread(self.render, data, displays)
+                self.versions = data['versions']
+        return self.snapshot
+
+    def collect(self, buffer):
+        """Copies of the metrics of the current data version, read on the event loop."""
+        # Process the data of the tools that changed since the previous snapshot
+        versions = {tool: buffer.version(stream_of(tool)) for tool in TOOLS[:-1]}
+        versions['all'] = buffer.total - buffer.version(0)
+        versions['pareto'] = buffer.version(0)
+        changed = [tool for tool in TOOLS if versions[tool] != self.versions.get(tool)]
+
+        tools = dict(self.snapshot.tools) or {tool: pd.DataFrame() for tool in TOOLS}
+        tools.update(self.capability.frames(MAX_ROWS, keys=changed))
+
+        # Get machine metrics
+        status = self.machine.metrics(buffer.tools_count)
+        status['spc_violations'] = self.spc.summary()
+
+        # Get tools stats
+        for tool in TOOLS:
+            df = tools[tool]
+            if df.empty or 'Timestamp' not in df.columns:
+                continue
+
+            idx = df['Timestamp'].idxmax()
+
+            for method in CAPABILITY_METHODS:
+                for cote in ['pos', 'ori']:
+                    for metric_type in ['cp', 'cpk']:
+                        column = f"{cote}_{method}_{metric_type}"
+                        if column in df.columns:
+                            value = df.at[idx, column]
+                            key = f"{tool}_{metric_type}_{cote}" + ("" if method == "rolling" else f"_{method}")
+                            status[key] = round(float(value), 4)
+
+        # Get downtimes, aggregated per error code as they are logged
+        pareto = self.snapshot.pareto
+        if versions['pareto'] != self.versions.get('pareto'):
+            pareto = self.downtimes.pareto()
+
+        return {
+            'version': buffer.total,
+            'versions': versions,
+            'tools': tools,
+            'pareto': pareto,
+            'status': status,
+            # control chart parts of the tools whose figures are rebuilt, copied from the growing histories
+            'histories': {
+                tool: tuple(array.copy() for array in self.capability.latest_values(tool, CONTROL_CHART_PARTS))
+                for tool in TOOLS[:-1] if tool in changed or tool not in self.tool_plots
+            },
+            'downtimes': self.downtimes.summary(),
+            'latest_downtimes': self.downtimes.to_frame(MAX_DOWNTIMES),
+            'violations': self.spc.to_frame(MAX_VIOLATIONS),
+            'history': self.rollups.history(TOOLS_COUNT),
+        }
+
+    def render(self, data, displays):
+        """Snapshot of collected metrics, with its figures, written to the data/*.json files. Runs in a worker thread."""
+        tools, pareto, status = data['tools'], data['pareto'], data['status']
+        with self.render_lock:
+            for tool, display in zip(TOOLS[:-1], displays[:-1]):
+                if tool in data['histories']:
+                    self.tool_plots[tool] = tuple(display.refresh(df=tools[tool], history=data['histories'][tool]))
+            plots = sum((self.tool_plots[tool] for tool in TOOLS[:-1]), ()) + general_plots(displays, pareto, status)
+
+        snapshot = Snapshot(version=data['version'], tools=tools, pareto=pareto, status=status, plots=plots)
+        self.export(data)
+        return snapshot
+
+    @staticmethod
+    def export(data):
+        """Write the collected metrics to the data/*.json files read by the agent tools."""
+        with open("data/status.json", "w") as f:
+            json.dump(data['status'], f, indent=4)
+
+        with open("data/downtimes.json", "w") as f:
+            json.dump({
+                "by_error_code": data['downtimes'],
+                "latest": json.loads(format_frame(data['latest_downtimes']).to_json(orient='records')),
+            }, f, indent=4)
+
+        with open("data/violations.json", "w") as f:
+            json.dump(json.loads(data['violations'].to_json(orient='records', date_format='iso')), f, indent=4)
+
+        with open("data/history.json", "w") as f:
+            json.dump(data['history'], f, indent=4)
@@ -1,123 +1,79 @@
 import asyncio
+import os
 from functools import partial
-import json
 
 import gradio as gr
 import pandas as pd
 
-from src.production.flow import generate_data
-from src.production.metrics.machine import machine_metrics, fetch_issues
-from src.production.metrics.tools import tools_metrics
+from src.production.flow import generate_data, TOOLS_COUNT
+from src.production.replay import (
+    TelemetryReplay, replay_data, shared_line, TELEMETRY_REPLAY, TELEMETRY_FOLLOW, REPLAY_SPEED
+)
+from src.production.metrics.tools import CAPABILITY_DISPLAY
+from src.ui.broadcast import Broadcast, empty_snapshot
 from src.ui.graphs.general_graphs import GeneralMetricsDisplay
 from src.ui.graphs.tools_graphs import ToolMetricsDisplay
+from src.ui.session import sessions
 
-MAX_ROWS = 1000
-TOOLS_COUNT = 2
+PIPELINE_INTERVAL = float(os.getenv("PIPELINE_INTERVAL", 0.5))     # seconds between two steps of a session pipeline
 
-def hash_dataframe(df):
-    """Computes a simple hash to detect changes in the DataFrame."""
-    return pd.util.hash_pandas_object(df).sum()
 
-async def dataflow(state):
+async def dataflow(state, displays):
     """
-    Main function that updates data if necessary.
-    Avoids processing if the raw data hasn't changed.
+    Main function that starts the data source of a session if necessary and returns the latest snapshot of the data.
+    The snapshot is computed once per data version and shared by the sessions watching the same buffer.
+    A paused session keeps its snapshot, even when following a live line that goes on.
     """
-    # Initialize state
-    state.setdefault('data', {}).setdefault('tools', {})
-    state['data']['tools'].setdefault('all', pd.DataFrame())
-
-    for i in range(1, TOOLS_COUNT + 1):
-        state['data']['tools'].setdefault(f'tool_{i}', pd.DataFrame())
-
-    state['data'].setdefault('issues', {})
+    state.setdefault('data', {})
     state.setdefault('status', {})
 
     # Check running state
     if state.get('running'):
-        if 'gen_task' not in state or state['gen_task'] is None or state['gen_task'].done():
-            state['gen_task'] = asyncio.create_task(generate_data(state))
-
-    raw_data = state['data'].get('raw_df', pd.DataFrame())
+        if TELEMETRY_FOLLOW:
+            # a live line is followed once for all sessions
+            state['data']['buffer'] = shared_line(TELEMETRY_FOLLOW)['data']['buffer']
+        elif 'gen_task' not in state or state['gen_task'] is None or state['gen_task'].done():
+            if TELEMETRY_REPLAY and 'replay' not in state['data']:
+                state['data']['replay'] = TelemetryReplay.from_path(TELEMETRY_REPLAY, speed=REPLAY_SPEED)
+            source = replay_data if 'replay' in state['data'] else generate_data
+            state['gen_task'] = asyncio.create_task(source(state))
+
+    buffer = state['data'].get('buffer')
+
+    # Paused, once the data source ended its last batch: nothing new to compute. When following a live
+    # line, the line goes on for the other sessions and a paused one keeps the version it had.
+    snapshot = state.get('snapshot')
+    source_done = state.get('gen_task') is None or state['gen_task'].done()
+    if not state.get('running') and snapshot is not None and (
+        TELEMETRY_FOLLOW or buffer is None or (source_done and snapshot.version == buffer.total)
+    ):
+        return snapshot
 
     # Cold start
-    if raw_data.empty:
-        return (
-                [pd.DataFrame()] * TOOLS_COUNT +    # outils
-                [pd.DataFrame()] +                  # all
-                [pd.DataFrame()] +                  # issues
-                [{}]                                # efficiency
-        )
+    if buffer is None or len(buffer) == 0:
+        return empty_snapshot(displays)
 
-    # Limit MAX_ROWS
-    if len(raw_data) > MAX_ROWS:
-        raw_data = raw_data.tail(MAX_ROWS)
-
-    # Check if data has changed
-    current_hash = hash_dataframe(raw_data)
-    if state.get('last_hash') == current_hash:
-        return [
-            pd.DataFrame(state['data']['tools'].get(f'tool_{i}', pd.DataFrame()))
-            for i in range(1, TOOLS_COUNT+1)
-        ] + [
-            pd.DataFrame(state['data']['tools'].get('all', pd.DataFrame()))
-        ] + [
-            pd.DataFrame(state['data']['issues'])
-        ] + [
-            state['status']
-        ]
-    state['last_hash'] = current_hash
-
-    # Process data
-    tools_data = await tools_metrics(raw_data)
-    tools_data = {tool: df for tool, df in tools_data.items() if not df.empty}
-    for tool, df in tools_data.items():
-        state['data']['tools'][tool] = df
-
-    # Get machine metrics
-    machine_data = await machine_metrics(raw_data)
-    state['status'] = machine_data
-
-    # Get tools stats
-    for tool in ['tool_1', 'tool_2', 'all']:
-        df = state['data']['tools'].get(tool, pd.DataFrame())
-        if df.empty or 'Timestamp' not in df.columns:
-            continue
-
-        df = df.copy()
-        df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
-        df.dropna(subset=['Timestamp'], inplace=True)
-
-        if df.empty:
-            continue
-
-        idx = df['Timestamp'].idxmax()
-
-        for cote in ['pos', 'ori']:
-            for metric_type in ['cp', 'cpk']:
-                column = f"{cote}_rolling_{metric_type}"
-                if column in df.columns:
-                    value = df.at[idx, column]
-                    key = f"{tool}_{metric_type}_{cote}"
-                    state['status'][key] = round(value, 4)
-
-    # Get issues
-    issues = await fetch_issues(raw_data)
-    state['data']['issues'] = issues
-
-    # Update situation
-    return (
-        [
-            pd.DataFrame(state['data']['tools'].get(f'tool_{i}', pd.DataFrame()))
-            for i in range(1, TOOLS_COUNT + 1)
-        ] + [
-            pd.DataFrame(state['data']['tools'].get('all', pd.DataFrame()))
-        ] + [
-            pd.DataFrame(state['data']['issues'])
-        ] + [
-            state['status']
-        ]
-    )
+    return await Broadcast.of(buffer).refresh(buffer, displays)
+
+
+async def pipeline(session, displays):
+    """
+    Background task of a session, producer -> metrics -> snapshot: keeps the data source running
+    and publishes the latest snapshot in session['snapshot'], until the session is closed.
+    Ticks only read that snapshot, so they never wait for generation nor computation.
+    Every step sweeps the idle sessions, so that the pipeline of a closed tab ends with its session
+    even when no other tab ticks.
+    """
+    while True:
+        sessions.evict()
+        if session.get('closed'):
+            break
+        try:
+            session['snapshot'] = await dataflow(session, displays)
+            session['status'] = session['snapshot'].status
+        except Exception as e:
+            print(f"Error in the dashboard pipeline: {e}")
+        await asyncio.sleep(PIPELINE_INTERVAL)
 
 
 def init_components(n=TOOLS_COUNT):
@@ -135,7 +91,7 @@ def init_components(n=TOOLS_COUNT):
     general_plots = []
 
     for i in range(1, n + 1):                   # Tool metrics displays
-        display = ToolMetricsDisplay()
+        display = ToolMetricsDisplay(method=CAPABILITY_DISPLAY)
         displays.append(display)
         tool_plots.extend(display.tool_block(df=pd.DataFrame(), id=i))
 
@@ -143,8 +99,7 @@ def init_components(n=TOOLS_COUNT):
     displays.append(main_display)
     general_plots.extend(
             main_display.general_block(
-            all_tools_df=pd.DataFrame(),
-            issues_df=pd.DataFrame(),
+            pareto_df=pd.DataFrame(),
             status={}
         )
     )
@@ -154,37 +109,27 @@ def init_components(n=TOOLS_COUNT):
 async def on_tick(state, displays):
     """
     Tick function called periodically to update plots if data has changed.
+    It only reads the latest snapshot published by the session pipeline, started on the first tick.
     Handles:
     - Tool-specific plots (tool_1, tool_2, ..., tool_n)
-    - General plots (all tools, issues, efficiency)
-    Returns two lists of plots separately for tools and general metrics, plus state.
+    - General plots (all tools, downtimes, efficiency)
+    Returns the plots for tools then general metrics, skipping those the session already shows.
+    `state` only holds the handle of the session, whose data lives in the session registry.
     """
-    async with state.setdefault('lock', asyncio.Lock()):
-
-        data = await dataflow(state)
-        tool_dfs = data[:-3]             # all individual tool DataFrames
-        all_tools_df = data[-3]          # 'all' tools DataFrame
-        issues_df = data[-2]             # issues DataFrame
-        status = data[-1]                # status dict
-
-        general_display = displays[-1]                      # General plots
-        general_plots = general_display.refresh(
-            all_tools_df=all_tools_df,
-            issues_df=issues_df,
-            status=status
-        )
-
-        tool_plots = []                                     # Tool-specific plots
-        for df, display in zip(tool_dfs, displays[:-1]):
-            tool_plots.extend(display.refresh(df=df))
-
-        with open("data/status.json", "w") as f:
-            json.dump(state["status"], f, indent=4)
-
-        with open("data/downtimes.json", "w") as f:
-            json.dump(issues_df.to_json(orient='records'), f, indent=4)
-
-        return tool_plots + general_plots + [state]
+    session = sessions.get(state)
+    if session is None:         # evicted or refused, the registry warned the tab
+        return [gr.skip()] * len(empty_snapshot(displays).plots)
+    if session.get('pipeline') is None or session['pipeline'].done():
+        session['pipeline'] = asyncio.create_task(pipeline(session, displays))
+    snapshot = session.get('snapshot') or empty_snapshot(displays)
+
+    # displays return the same figure while what it shows is unchanged
+    sent = session.get('sent', ())
+    session['sent'] = snapshot.plots
+    return [
+        gr.skip() if i < len(sent) and plot is sent[i] else plot
+        for i, plot in enumerate(snapshot.plots)
+    ]
 
 def dashboard_ui(state):
     """
@@ -198,5 +143,5 @@ def dashboard_ui(state):
     timer.tick(
         fn=partial(on_tick, displays=displays),
         inputs=[state],
-        outputs=tool_plots + general_plots + [state]
+        outputs=tool_plots + general_plots
     )
\ No newline at end of file
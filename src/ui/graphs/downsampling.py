@@ -0,0 +1,59 @@
+import numpy as np
+
+
+def lttb(x, y, threshold):
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets: the first and last points, and
+    in each of `threshold - 2` buckets the point forming the largest triangle with the point kept
+    in the previous bucket and the average of the next one. Keeps the shape of the series,
+    peaks included, with at most `threshold` points.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)     # buckets between the first and last points
+    starts, stops = edges[:-1], edges[1:]
+    counts = stops - starts
+    cumulative_x = np.concatenate([[0], np.cumsum(x)])
+    cumulative_y = np.concatenate([[0], np.cumsum(y)])
+    # average point of the bucket after each one, the last point after the last bucket
+    next_x = np.append((cumulative_x[stops[1:]] - cumulative_x[starts[1:]]) / counts[1:], x[-1])
+    next_y = np.append((cumulative_y[stops[1:]] - cumulative_y[starts[1:]]) / counts[1:], y[-1])
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket, (start, stop) in enumerate(zip(starts, stops)):
+        area = np.abs(
+            (x[previous] - next_x[bucket]) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y[bucket] - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def downsample(x, y, threshold, lsl=None, usl=None):
+    """
+    Indices of the points of a control chart trace to draw: LTTB down to `threshold` points, plus in
+    each of `threshold` buckets the highest point above usl and the lowest below lsl, so that
+    out-of-spec parts never disappear from the chart while the trace stays under 3 x `threshold` points.
+    """
+    kept = lttb(x, y, threshold)
+    if len(kept) == len(x) or lsl is None:
+        return kept
+    y = np.asarray(y, dtype=np.float64)
+    bucket = np.arange(len(y)) * threshold // len(y)
+    extremes = [kept]
+    for out_of_spec, sign in [(y > usl, 1), (y < lsl, -1)]:
+        rows = np.flatnonzero(out_of_spec)
+        if len(rows) == 0:
+            continue
+        # most extreme row of each bucket: last of the rows sorted by bucket then value
+        rows = rows[np.lexsort((sign * y[rows], bucket[rows]))]
+        last = np.append(bucket[rows][1:] != bucket[rows][:-1], True)
+        extremes.append(rows[last])
+    return np.unique(np.concatenate(extremes))
@@ -2,87 +2,109 @@ import gradio as gr
 import pandas as pd
 import plotly.graph_objects as go
 
+from src.ui.graphs.templates import FigureTemplates
+
 
 class GeneralMetricsDisplay:
     def __init__(self):
         self.plots = []
+        self.figures = {}       # name -> (what the figure shows, figure), see cached()
+        self.templates = FigureTemplates()
+
+    def cached(self, name, key, build):
+        """
+        Figure `name` from the previous refresh when `key`, what it shows, did not change, else `build()`.
+        Returning the same figure lets the dashboard skip sending it again.
+        """
+        if name not in self.figures or self.figures[name][0] != key:
+            self.figures[name] = (key, build())
+        return self.figures[name][1]
 
-    @staticmethod
-    def kpi_rate(percentage, title="KPI"):
+    def kpi_rate(self, percentage, title="KPI"):
         if percentage is None or not (0 <= percentage <= 100):
-            fig = go.Figure()
+            def no_data():
+                fig = go.Figure()
+                fig.update_layout(
+                    template='plotly_dark',
+                    width=320,
+                    height=150,
+                    margin=dict(l=10, r=10, t=10, b=10),
+                    annotations=[dict(
+                        text="No data",
+                        showarrow=False,
+                        font=dict(size=16, color="white"),
+                        x=0.5, y=0.5, xanchor="center", yanchor="middle"
+                    )]
+                )
+                return fig
+            return self.templates("rate_no_data", no_data).render()
+
+        def layout():
+            fig = go.Figure(data=[go.Pie(
+                values=[0, 100],
+                labels=['', ''],
+                hole=0.6,
+                marker_colors=['#2CFCFF', '#444444'],
+                textinfo='none',
+                hoverinfo='skip',
+                sort=False,
+                domain=dict(x=[0.4, 0.95], y=[0.15, 0.85])
+            )])
             fig.update_layout(
                 template='plotly_dark',
-                width=320,
-                height=150,
+                annotations=[
+                    dict(
+                        text="",
+                        x=0.675, y=0.5,
+                        font_size=20,
+                        showarrow=False,
+                        font=dict(color="white"),
+                        xanchor="center", yanchor="middle"
+                    ),
+                    dict(
+                        text=title,
+                        x=0.05, y=0.5,
+                        showarrow=False,
+                        font=dict(size=16, color="white"),
+                        xanchor="left", yanchor="middle"
+                    )
+                ],
+                showlegend=False,
                 margin=dict(l=10, r=10, t=10, b=10),
-                annotations=[dict(
-                    text="No data",
-                    showarrow=False,
-                    font=dict(size=16, color="white"),
-                    x=0.5, y=0.5, xanchor="center", yanchor="middle"
-                )]
+                width=320,
+                height=150
             )
             return fig
-        fig = go.Figure(data=[go.Pie(
-            values=[percentage, 100 - percentage],
-            labels=['', ''],
-            hole=0.6,
-            marker_colors=['#2CFCFF', '#444444'],
-            textinfo='none',
-            hoverinfo='skip',
-            sort=False,
-            domain=dict(x=[0.4, 0.95], y=[0.15, 0.85])
-        )])
-        fig.update_layout(
-            template='plotly_dark',
-            annotations=[
-                dict(
-                    text=f"{percentage:.0f}%",
-                    x=0.675, y=0.5,
-                    font_size=20,
-                    showarrow=False,
-                    font=dict(color="white"),
-                    xanchor="center", yanchor="middle"
-                ),
-                dict(
-                    text=title,
-                    x=0.05, y=0.5,
-                    showarrow=False,
-                    font=dict(size=16, color="white"),
-                    xanchor="left", yanchor="middle"
-                )
-            ],
-            showlegend=False,
-            margin=dict(l=10, r=10, t=10, b=10),
-            width=320,
-            height=150
+        template = self.templates(f"rate_{title}", layout)
+        return template.render(
+            data={0: template.trace(0, values=[percentage, 100 - percentage])},
+            annotations=template.annotations(f"{percentage:.0f}%", title),
         )
-        return fig
 
-    @staticmethod
-    def kpi_value(value, title="Valeur"):
+    def kpi_value(self, value, title="Valeur"):
         width = 360
         if value is None or (isinstance(value, str) and (value.strip() == "" or value.strip().isdigit() and len(value.strip()) > 8)):
-            fig = go.Figure()
-            fig.update_layout(
-                template='plotly_dark',
-                width=width,
-                height=125,
-                margin=dict(l=30, r=0, t=0, b=30),
-                xaxis=dict(visible=False),
-                yaxis=dict(visible=False),
-                plot_bgcolor='#111111',
-                paper_bgcolor='#111111',
-                annotations=[dict(
-                    text="No data",
-                    showarrow=False,
-                    font=dict(size=16, color="white"),
-                    x=0.5, y=0.5,
-                    xanchor="center", yanchor="middle"
-                )]
-            )
-            return fig
+            def no_data():
+                fig = go.Figure()
+                fig.update_layout(
+                    template='plotly_dark',
+                    width=width,
+                    height=125,
+                    margin=dict(l=30, r=0, t=0, b=30),
+                    xaxis=dict(visible=False),
+                    yaxis=dict(visible=False),
+                    plot_bgcolor='#111111',
+                    paper_bgcolor='#111111',
+                    annotations=[dict(
+                        text="No data",
+                        showarrow=False,
+                        font=dict(size=16, color="white"),
+                        x=0.5, y=0.5,
+                        xanchor="center", yanchor="middle"
+                    )]
+                )
+                return fig
+            return self.templates("value_no_data", no_data).render()
         try:
             if isinstance(value, (int, float)):
                 formatted = f"{int(value)}" if float(value).is_integer() else f"{float(value):.2f}"
@@ -98,118 +120,102 @@ class GeneralMetricsDisplay:
                 formatted = f"{int(numeric_value)}" if numeric_value.is_integer() else f"{numeric_value:.2f}"
             except (ValueError, TypeError):
                 formatted = str(value)
-        fig = go.Figure()
-        fig.add_annotation(
-            text=f"<b>{formatted}</b>",
-            x=0.5, y=0.5,
-            showarrow=False,
-            font=dict(size=24, color="white"),
-            xanchor="center", yanchor="middle"
-        )
-        fig.add_annotation(
-            text=title,
-            x=0.5, y=1.8,
-            showarrow=False,
-            font=dict(size=16, color="lightgray"),
-            xanchor="center", yanchor="middle"
-        )
-        fig.update_layout(
-            template='plotly_dark',
-            width=width,
-            height=150,
-            margin=dict(l=40, r=0, t=0, b=40),
-            xaxis=dict(visible=False),
-            yaxis=dict(visible=False),
-            plot_bgcolor='#111111',
-            paper_bgcolor='#111111'
-        )
-        return fig
-
-    @staticmethod
-    def get_max_part_id(df):
-        if not df.empty and 'Part ID' in df.columns:
-            try:
-                numeric_ids = pd.to_numeric(df['Part ID'], errors='coerce')
-                return int(numeric_ids.dropna().max())
-            except Exception:
-                return None
-        return None
 
-    @staticmethod
-    def pareto(issues_df, error_col='Error Type'):
-        if issues_df is None or issues_df.empty:
+        def layout():
             fig = go.Figure()
+            fig.add_annotation(
+                text="",
+                x=0.5, y=0.5,
+                showarrow=False,
+                font=dict(size=24, color="white"),
+                xanchor="center", yanchor="middle"
+            )
+            fig.add_annotation(
+                text=title,
+                x=0.5, y=1.8,
+                showarrow=False,
+                font=dict(size=16, color="lightgray"),
+                xanchor="center", yanchor="middle"
+            )
             fig.update_layout(
                 template='plotly_dark',
-                annotations=[dict(
-                    text="No Error",
-                    showarrow=False,
-                    font=dict(size=16, color="white")
-                )]
+                width=width,
+                height=150,
+                margin=dict(l=40, r=0, t=0, b=40),
+                xaxis=dict(visible=False),
+                yaxis=dict(visible=False),
+                plot_bgcolor='#111111',
+                paper_bgcolor='#111111'
             )
             return fig
-        issues_df['Downtime Start'] = pd.to_datetime(issues_df['Downtime Start'], errors='coerce')
-        issues_df['Downtime End'] = pd.to_datetime(issues_df['Downtime End'], errors='coerce')
-        issues_df['Downtime Duration'] = (issues_df['Downtime End'] - issues_df[
-            'Downtime Start']).dt.total_seconds() / 60
-        issues_df = issues_df.dropna(subset=['Downtime Duration'])
-        grouped = issues_df.groupby(error_col)['Downtime Duration'].sum().sort_values(ascending=False)
-        if grouped.empty:
+        template = self.templates(f"value_{title}", layout)
+        return template.render(annotations=template.annotations(f"<b>{formatted}</b>", title))
+
+    def pareto(self, pareto_df):
+        if pareto_df is None or pareto_df.empty:
+            def no_error():
+                fig = go.Figure()
+                fig.update_layout(
+                    template='plotly_dark',
+                    annotations=[dict(
+                        text="No Error",
+                        showarrow=False,
+                        font=dict(size=16, color="white")
+                    )]
+                )
+                return fig
+            return self.templates("pareto_no_error", no_error).render()
+
+        def layout():
             fig = go.Figure()
+            fig.add_trace(
+                go.Bar(
+                    x=[],
+                    y=[],
+                    name='Downtime (min)',
+                    marker_color='#2CFCFF',
+                    yaxis='y1'
+                )
+            )
+            fig.add_trace(go.Scatter(
+                x=[],
+                y=[],
+                name='Cumulative %',
+                yaxis='y2',
+                mode='lines+markers',
+                line=dict(color='orange', width=2),
+                marker=dict(size=8)
+            ))
             fig.update_layout(
                 template='plotly_dark',
-                annotations=[dict(
-                    text="No Error",
-                    showarrow=False,
-                    font=dict(size=16, color="white")
-                )]
+                title="Pareto of errors by downtime",
+                xaxis=dict(title="Errors"),
+                yaxis=dict(
+                    title='Downtime (minutes)',
+                    showgrid=False,
+                    side='left'
+                ),
+                yaxis2=dict(
+                    title='Cumulative percentage (%)',
+                    overlaying='y',
+                    side='right',
+                    range=[0, 110],
+                    showgrid=False,
+                    tickformat='%'
+                ),
+                legend=dict(x=0.7, y=1.1),
+                margin=dict(l=70, r=70, t=50, b=50),
             )
             return fig
-        cumulative = grouped.cumsum() / grouped.sum() * 100
-        labels = grouped.index.tolist()
-        durations = grouped.values
-        fig = go.Figure()
-        fig.add_trace(
-            go.Bar(
-                x=labels,
-                y=durations,
-                name='Downtime (min)',
-                marker_color='#2CFCFF',
-                yaxis='y1'
-            )
-        )
-        fig.add_trace(go.Scatter(
-            x=labels,
-            y=cumulative,
-            name='Cumulative %',
-            yaxis='y2',
-            mode='lines+markers',
-            line=dict(color='orange', width=2),
-            marker=dict(size=8)
-        ))
-        fig.update_layout(
-            template='plotly_dark',
-            title="Pareto of errors by downtime",
-            xaxis=dict(title="Errors"),
-            yaxis=dict(
-                title='Downtime (minutes)',
-                showgrid=False,
-                side='left'
-            ),
-            yaxis2=dict(
-                title='Cumulative percentage (%)',
-                overlaying='y',
-                side='right',
-                range=[0, 110],
-                showgrid=False,
-                tickformat='%'
-            ),
-            legend=dict(x=0.7, y=1.1),
-            margin=dict(l=70, r=70, t=50, b=50),
-        )
-        return fig
+        template = self.templates("pareto", layout)
+
+        labels = pareto_df['Error Code'].tolist()
+        return template.render(data={
+            0: template.trace(0, x=labels, y=pareto_df['Downtime (min)'].to_numpy()),
+            1: template.trace(1, x=labels, y=pareto_df['Cumulative %'].to_numpy()),
+        })
 
-    def general_block(self, all_tools_df, issues_df, status):
+    def general_block(self, pareto_df, status):
         header = f"Metrics Summary"
         html_content = f"""
         <div style="display: flex; align-items: center; justify-content: flex-start; width: 100%;">
@@ -224,7 +230,7 @@ class GeneralMetricsDisplay:
                 with gr.Row(height=125):
                     total_count = gr.Plot(
                         self.kpi_value(
-                            value=self.get_max_part_id(all_tools_df),
+                            value=status.get("part_count"),
                             title="Total Count (parts)"
                         )
                     )
@@ -274,7 +280,7 @@ class GeneralMetricsDisplay:
                 with gr.Group():
                     with gr.Row(height=450):
                         pareto = gr.Plot(
-                            self.pareto(issues_df, error_col='Error Code')
+                            self.pareto(pareto_df)
                         )
         self.plots = [
             total_count, total_time,
@@ -284,14 +290,25 @@ class GeneralMetricsDisplay:
         ]
         return self.plots
 
-    def refresh(self, all_tools_df, issues_df, status):
-        return [
-            self.kpi_value(value=self.get_max_part_id(all_tools_df), title="Total Count (parts)"),
-            self.kpi_value(value=status.get("opening_time", "0 days 00:00:00"), title="Total Time"),
-            self.kpi_rate(percentage=status.get('OEE', 0), title="OEE"),
-            self.kpi_rate(percentage=status.get("quality_rate", 0), title="Quality Rate"),
-            self.kpi_rate(percentage=status.get("availability_rate", 0), title="Availability"),
-            self.kpi_value(value=status.get("MTBF", "0 days 00:00:00"), title="MTBF"),
-            self.kpi_value(value=status.get("MTTR", "0 days 00:00:00"), title="MTTR"),
-            self.pareto(issues_df, error_col='Error Code')
-        ]
\ No newline at end of file
+    def refresh(self, pareto_df, status):
+        """KPI cards and pareto, rebuilt only for those whose displayed values changed."""
+        values = [
+            ("Total Count (parts)", status.get("part_count")),
+            ("Total Time", status.get("opening_time", "0 days 00:00:00")),
+        ]
+        rates = [
+            ("OEE", status.get('OEE', 0)),
+            ("Quality Rate", status.get("quality_rate", 0)),
+            ("Availability", status.get("availability_rate", 0)),
+        ]
+        times = [
+            ("MTBF", status.get("MTBF", "0 days 00:00:00")),
+            ("MTTR", status.get("MTTR", "0 days 00:00:00")),
+        ]
+        return (
+            [self.cached(title, value, lambda: self.kpi_value(value=value, title=title)) for title, value in values]
+            + [self.cached(title, rate, lambda: self.kpi_rate(percentage=rate, title=title)) for title, rate in rates]
+            + [self.cached(title, value, lambda: self.kpi_value(value=value, title=title)) for title, value in times]
+            # the pareto frame is only replaced when errors were logged, and kept in the key so that its id is not reused
+            + [self.cached("pareto", (id(pareto_df), pareto_df), lambda: self.pareto(pareto_df))]
+        )
@@ -0,0 +1,47 @@
+import plotly.io as pio
+from gradio.components.plot import PlotData
+
+
+class FigureTemplate:
+    """
+    JSON of a figure built and validated once by Plotly, layout and template included.
+    render() swaps only what changes (trace arrays, annotation text...) in a shallow copy of it and
+    serializes it the way gr.Plot would, without building nor validating a new go.Figure.
+    """
+    def __init__(self, figure):
+        self.spec = figure.to_plotly_json()
+        self.static = None
+
+    def trace(self, i, **values):
+        """Trace `i` of the template with `values` replaced."""
+        return dict(self.spec["data"][i], **values)
+
+    def annotations(self, *texts):
+        """Annotations of the template with their text replaced by `texts`, in order."""
+        return [dict(annotation, text=text) for annotation, text in zip(self.spec["layout"]["annotations"], texts)]
+
+    def render(self, data=None, **layout):
+        """
+        PlotData of the template with the traces of `data` (index -> trace) and the `layout` properties replaced.
+        Without changes, the same PlotData is returned every time.
+        """
+        if data is None and not layout:
+            if self.static is None:
+                self.static = PlotData(type="plotly", plot=pio.to_json(self.spec, validate=False))
+            return self.static
+        spec = {
+            "data": [(data or {}).get(i, trace) for i, trace in enumerate(self.spec["data"])],
+            "layout": dict(self.spec["layout"], **layout),
+        }
+        return PlotData(type="plotly", plot=pio.to_json(spec, validate=False))
+
+
+class FigureTemplates:
+    """FigureTemplate of each kind of figure of a display, built on first use."""
+    def __init__(self):
+        self.templates = {}
+
+    def __call__(self, name, build):
+        if name not in self.templates:
+            self.templates[name] = FigureTemplate(build())
+        return self.templates[name]
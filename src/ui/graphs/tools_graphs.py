@@ -3,202 +3,235 @@ import numpy as np
 import plotly.graph_objects as go
 from scipy.stats import norm
 
+from src.production.specs import CHARACTERISTICS, registry
+from src.ui.graphs.downsampling import downsample
+from src.ui.graphs.templates import FigureTemplates
+
+PREFIXES = {cote: name for name, (cote, _) in CHARACTERISTICS.items()}
+
 
 class ToolMetricsDisplay:
-    def __init__(self):
+    def __init__(self, method="rolling"):
         self.df = None
+        self.method = method        # capability method of the gauges and normal curves (see metrics.tools)
         self.pos_color = '#2CFCFF'
         self.ori_color = '#ff8508'
+        self.colors = {'pos': self.pos_color, 'ori': self.ori_color}
+        self.limits = registry.spec()   # of the product until tool_block() sets the tool
         self.plots = []
+        self.figures = {}               # name -> (what the figure shows, figure), see cached()
+        self.templates = FigureTemplates()
+
+    def cached(self, name, key, build):
+        """
+        Figure `name` from the previous refresh when `key`, what it shows, did not change, else `build()`.
+        Returning the same figure lets the dashboard skip sending it again.
+        """
+        if name not in self.figures or self.figures[name][0] != key:
+            self.figures[name] = (key, build())
+        return self.figures[name][1]
 
     @staticmethod
-    def gauge(df, type=None, cote=None):
+    def last_values(df, columns):
+        """Rounded values of `columns` at the latest timestamp, None without data."""
+        if df is None or df.empty:
+            return None
+        idx = df['Timestamp'].idxmax()
+        return tuple(round(float(value), 4) for value in df.loc[idx, columns])
+
+    def gauge(self, df, type=None, cote=None):
         width = 205
         height = 150
         margin = dict(l=30, r=50, t=50, b=0)
         if df is None or df.empty:
-            fig = go.Figure()
+            def no_data():
+                fig = go.Figure()
+                fig.update_layout(
+                    template='plotly_dark',
+                    width=width,
+                    height=height,
+                    margin=margin,
+                    annotations=[dict(
+                        text="No data",
+                        showarrow=False,
+                        font=dict(size=16, color="white")
+                    )]
+                )
+                return fig
+            return self.templates("gauge_no_data", no_data).render()
+
+        def layout():
+            fig = go.Figure(go.Indicator(
+                mode="gauge+number",
+                value=0,
+                number={'font': {'color': 'white', 'size': 20}},
+                domain={'x': [0, 1], 'y': [0, 1]},
+                title={'text': type, 'font': {'color': 'white', 'size': 16}},
+                gauge={'axis': {'range': [0, 3]},
+                       'bar': {'color': 'black', 'thickness': 0.4},
+                       'steps': [
+                           {'range': [0, 1.33], 'color': "red"},
+                           {'range': [1.33, 2], 'color': "yellow"},
+                           {'range': [2, 3], 'color': "green"}],
+                       'threshold': {
+                           'line': {'color': 'black', 'width': 3},
+                           'thickness': 0.8,
+                           'value': 0}}
+            ))
             fig.update_layout(
                 template='plotly_dark',
                 width=width,
                 height=height,
                 margin=margin,
-                annotations=[dict(
-                    text="No data",
-                    showarrow=False,
-                    font=dict(size=16, color="white")
-                )]
             )
             return fig
-        column = f"{cote}_rolling_{type}"
+        template = self.templates(f"gauge_{type}", layout)
+
+        column = f"{cote}_{self.method}_{type}"
         idx = df['Timestamp'].idxmax()
-        value = df.loc[idx, column]
-        fig = go.Figure(go.Indicator(
-            mode="gauge+number",
-            value=value,
-            number={'font': {'color': 'white', 'size': 20}},
-            domain={'x': [0, 1], 'y': [0, 1]},
-            title={'text': type, 'font': {'color': 'white', 'size': 16}},
-            gauge={'axis': {'range': [0, 3]},
-                   'bar': {'color': 'black', 'thickness': 0.4},
-                   'steps': [
-                       {'range': [0, 1.33], 'color': "red"},
-                       {'range': [1.33, 2], 'color': "yellow"},
-                       {'range': [2, 3], 'color': "green"}],
-                   'threshold': {
-                       'line': {'color': 'black', 'width': 3},
-                       'thickness': 0.8,
-                       'value': value}}
-        ))
-        fig.update_layout(
-            template='plotly_dark',
-            width=width,
-            height=height,
-            margin=margin,
-        )
-        return fig
+        value = float(df.loc[idx, column])
+        indicator = template.trace(0, value=value)
+        indicator["gauge"] = dict(indicator["gauge"], threshold=dict(indicator["gauge"]["threshold"], value=value))
+        return template.render(data={0: indicator})
 
-    def control_graph(self, df):
+    def control_graph(self, df, history=None):
+        """
+        Values of the tool's parts, from `history` (timestamps, parts x characteristics) when given,
+        else from `df`, downsampled to the plot width, with the specification limits as lines.
+        """
         width = 832
         height = 400
         margin = dict(l=70, r=100, t=30, b=70)
         if df is None or df.empty:
+            def no_data():
+                fig = go.Figure()
+                fig.update_layout(
+                    template='plotly_dark',
+                    xaxis_title='Timestamp',
+                    yaxis_title='Values',
+                    showlegend=True,
+                    width=width,
+                    height=height,
+                    margin=margin,
+                    annotations=[dict(
+                        text="No data",
+                        showarrow=False,
+                        font=dict(size=20, color="white")
+                    )]
+                )
+                return fig
+            return self.templates("control_no_data", no_data).render()
+
+        def layout():
             fig = go.Figure()
+            for name, (cote, column) in CHARACTERISTICS.items():
+                fig.add_trace(
+                    go.Scatter(
+                        x=[], y=[],
+                        mode='lines+markers', line=dict(color=self.colors[cote]),
+                        name=cote
+                    )
+                )
             fig.update_layout(
                 template='plotly_dark',
                 xaxis_title='Timestamp',
-                yaxis_title='Values',
+                yaxis_title='Valeurs',
                 showlegend=True,
                 width=width,
                 height=height,
-                margin=margin,
-                annotations=[dict(
-                    text="No data",
-                    showarrow=False,
-                    font=dict(size=20, color="white")
-                )]
+                margin=margin
             )
             return fig
-        fig = go.Figure()
-        fig.add_trace(
-            go.Scatter(
-                x=df['Timestamp'], y=[0.3] * len(df),
-                mode='lines',
-                line=dict(dash='dot', color=self.pos_color, width=1),
-                name='lsl pos'
-            )
-        )
-        fig.add_trace(
-            go.Scatter(
-                x=df['Timestamp'], y=[0.5] * len(df),
-                mode='lines',
-                line=dict(dash='dot', color=self.pos_color, width=1),
-                name='usl pos'
-            )
-        )
-        fig.add_trace(
-            go.Scatter(
-                x=df['Timestamp'], y=[0.2] * len(df),
-                mode='lines',
-                line=dict(dash='dot', color=self.ori_color, width=1),
-                name='lsl ori'
-            )
-        )
-        fig.add_trace(
-            go.Scatter(
-                x=df['Timestamp'], y=[0.6] * len(df),
-                mode='lines',
-                line=dict(dash='dot', color=self.ori_color, width=1),
-                name='usl ori'
-            )
-        )
-        fig.add_trace(
-            go.Scatter(
-                x=df['Timestamp'], y=df['Position'],
-                mode='lines+markers', line=dict(color=self.pos_color),
-                name='pos'
-            )
-        )
-        fig.add_trace(
-            go.Scatter(
-                x=df['Timestamp'], y=df['Orientation'],
-                mode='lines+markers', line=dict(color=self.ori_color),
-                name='ori'
-            )
-        )
-        fig.update_layout(
-            template='plotly_dark',
-            xaxis_title='Timestamp',
-            yaxis_title='Valeurs',
-            showlegend=True,
-            width=width,
-            height=height,
-            margin=margin
-        )
-        return fig
+        template = self.templates("control", layout)
+
+        if history is None:
+            timestamps, values = df['Timestamp'].to_numpy(), df[[column for _, column in CHARACTERISTICS.values()]].to_numpy()
+        else:
+            timestamps, values = history
+        x = timestamps.astype("datetime64[s]").astype(np.int64)
+        max_points = width - margin['l'] - margin['r']      # about one point per pixel of the plot area
+
+        data, shapes = {}, []
+        for j, (name, (cote, column)) in enumerate(CHARACTERISTICS.items()):
+            lsl, usl = self.limits[name]
+            kept = downsample(x, values[:, j], max_points, lsl, usl)
+            data[j] = template.trace(j, x=np.datetime_as_string(timestamps[kept], unit='s'), y=values[kept, j])
+            for limit, value in [('lsl', lsl), ('usl', usl)]:
+                shapes.append(dict(
+                    type='line', xref='paper', x0=0, x1=1, yref='y', y0=value, y1=value,
+                    line=dict(dash='dot', color=self.colors[cote], width=1),
+                    name=f'{limit} {cote}', showlegend=True
+                ))
+        return template.render(data=data, shapes=shapes)
 
     def normal_curve(self, df, cote=None):
         width = 410
         height= 250
         margin= dict(l=20, r=70, t=20, b=20)
         if df is None or df.empty:
+            def no_data():
+                fig = go.Figure()
+                fig.update_layout(
+                    template='plotly_dark',
+                    showlegend=False,
+                    width=width,
+                    height=height,
+                    margin=margin,
+                    annotations=[dict(
+                        text="No data",
+                        showarrow=False,
+                        font=dict(size=16, color="white")
+                    )]
+                )
+                return fig
+            return self.templates("normal_no_data", no_data).render()
+
+        color = self.colors[cote]
+
+        def layout():
             fig = go.Figure()
+            fig.add_trace(
+                go.Scatter(
+                    x=[], y=[],
+                    mode='lines',
+                    name='Normal Curve',
+                    line=dict(color=color)
+                )
+            )
+            for limit in ['usl', 'lsl']:
+                fig.add_shape(
+                    type="line", x0=0, y0=0, x1=0, y1=0,
+                    line=dict(color="red", width=1, dash="dot"),
+                    name=limit
+                )
             fig.update_layout(
                 template='plotly_dark',
                 showlegend=False,
                 width=width,
                 height=height,
-                margin=margin,
-                annotations=[dict(
-                    text="No data",
-                    showarrow=False,
-                    font=dict(size=16, color="white")
-                )]
+                margin=margin
             )
             return fig
-        if cote == 'pos':
-            color = self.pos_color
-            lsl = 0.3
-            usl = 0.5
-        else:
-            color = self.ori_color
-            lsl = 0.2
-            usl = 0.6
-        mu_column = f"{cote}_rolling_mean"
-        std_column = f"{cote}_rolling_std"
+        template = self.templates(f"normal_{cote}", layout)
+
+        lsl, usl = self.limits[PREFIXES[cote]]
+        mu_column = f"{cote}_{self.method}_mean"
+        std_column = f"{cote}_{self.method}_std"
         idx = df['Timestamp'].idxmax()
         mu, std = df.loc[idx, [mu_column, std_column]]
         x = np.linspace(mu - 3 * std, mu + 3 * std, 100)
         y = norm.pdf(x, mu, std)
-        fig = go.Figure()
-        fig.add_trace(
-            go.Scatter(
-                x=x, y=y,
-                mode='lines',
-                name='Normal Curve',
-                line=dict(color=color)
-            )
+        usl_shape, lsl_shape = template.spec["layout"]["shapes"]
+        return template.render(
+            data={0: template.trace(0, x=x, y=y)},
+            shapes=[
+                dict(usl_shape, x0=usl, x1=usl, y1=float(np.max(y))),
+                dict(lsl_shape, x0=lsl, x1=lsl, y1=float(np.max(y))),
+            ],
         )
-        fig.add_shape(
-            type="line", x0=usl, y0=0, x1=usl, y1=max(y),
-            line=dict(color="red", width=1, dash="dot"),
-            name='usl'
-        )
-        fig.add_shape(
-            type="line", x0=lsl, y0=0, x1=lsl, y1=max(y),
-            line=dict(color="red", width=1, dash="dot"),
-            name='lsl'
-        )
-        fig.update_layout(
-            template='plotly_dark',
-            showlegend=False,
-            width=width,
-            height=height,
-            margin=margin
-        )
-        return fig
 
     def tool_block(self, df, id=1):
+        self.limits = registry.spec(id)
         header = f"Tool {id}"
         html_content = f"""
         <div style="display: flex; align-items: center; justify-content: flex-start; width: 100%;">
@@ -264,13 +297,23 @@ class ToolMetricsDisplay:
             ]
             return self.plots
 
-    def refresh(self, df):
-        return [
-            self.normal_curve(df, cote='pos'),
-            self.gauge(df, type='cp', cote='pos'),
-            self.gauge(df, type='cpk', cote='pos'),
-            self.normal_curve(df, cote='ori'),
-            self.gauge(df, type='cp', cote='ori'),
-            self.gauge(df, type='cpk', cote='ori'),
-            self.control_graph(df),
-        ]
\ No newline at end of file
+    def refresh(self, df, history=None):
+        """
+        Figures of the tool, rebuilt only for those whose displayed values changed.
+        `history` (timestamps, values) feeds the control chart with more parts than `df`.
+        """
+        figures = []
+        for cote in ['pos', 'ori']:
+            stats = [f"{cote}_{self.method}_mean", f"{cote}_{self.method}_std"]
+            figures.append(self.cached(
+                f"{cote}_normal", self.last_values(df, stats), lambda: self.normal_curve(df, cote=cote)
+            ))
+            for type in ['cp', 'cpk']:
+                figures.append(self.cached(
+                    f"{cote}_{type}", self.last_values(df, [f"{cote}_{self.method}_{type}"]),
+                    lambda: self.gauge(df, type=type, cote=cote)
+                ))
+        # a new frame means new parts; the frame is kept in the key so that its id is not reused
+        key = None if df is None or df.empty else (id(df), df)
+        figures.append(self.cached("control", key, lambda: self.control_graph(df, history)))
+        return figures
\ No newline at end of file
@@ -1,27 +1,128 @@
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
 import gradio as gr
 
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", 600))     # seconds without a tick before eviction
+SESSION_MAX = int(os.getenv("SESSION_MAX", 64))                           # sessions at most, new ones refused beyond
+
+
+def new_session():
+    return {
+        "running": False,
+        "date": datetime.now(),
+        "part_id": 0,
+        "status": {},
+        "data": {},
+    }
+
+
+class SessionRegistry:
+    """
+    Heavy per-session objects (buffer, simulators, generation and pipeline tasks...), kept in process and
+    keyed by the small handle stored in gr.State, so that Gradio never copies nor serializes them.
+    Sessions idle for SESSION_IDLE_TIMEOUT are evicted, and their handle is not given a new session
+    until Reset. Beyond SESSION_MAX active sessions, new ones are refused instead of evicting active ones.
+    """
+    def __init__(self, idle_timeout=SESSION_IDLE_TIMEOUT, max_sessions=SESSION_MAX):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()       # handle -> (session, last access), least recent first
+        self.evicted = OrderedDict()        # handle -> whether its tab was warned, most recent last
+        self.refused = set()                # handles warned that the registry is full
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def get(self, state):
+        """
+        Session of a gr.State handle, created on first access.
+        None, with a warning shown once, if the session was evicted or the registry is full.
+        """
+        if state.get('session') is None:
+            state['session'] = uuid.uuid4().hex
+        handle = state['session']
+        self.evict()
+        if handle in self.sessions:
+            session = self.sessions.pop(handle)[0]
+        elif handle in self.evicted:
+            if not self.evicted[handle]:
+                self.evicted[handle] = True
+                gr.Warning("Session closed after inactivity, press Reset to start a new one.")
+            return None
+        elif len(self.sessions) >= self.max_sessions:
+            if handle not in self.refused:
+                if len(self.refused) > 16 * self.max_sessions:     # tabs closed while waiting
+                    self.refused.clear()
+                self.refused.add(handle)
+                gr.Warning(f"Too many dashboards open ({self.max_sessions}), retrying until one is closed.")
+            return None
+        else:
+            self.refused.discard(handle)
+            session = new_session()
+        self.sessions[handle] = (session, time.monotonic())
+        return session
+
+    def drop(self, state):
+        """Forget the session of a handle, stopping its data source, and give the tab a new handle."""
+        handle = state.get('session')
+        session, _ = self.sessions.pop(handle, (None, None))
+        if session is not None:
+            self._stop(session)
+        self.evicted.pop(handle, None)
+        self.refused.discard(handle)
+        state['session'] = None
+
+    def evict(self):
+        """Stop and forget the sessions idle for longer than the timeout."""
+        now = time.monotonic()
+        while self.sessions:
+            handle, (session, last_access) = next(iter(self.sessions.items()))
+            if now - last_access <= self.idle_timeout:
+                break
+            del self.sessions[handle]
+            self._stop(session)
+            self.evicted[handle] = False
+            if len(self.evicted) > 16 * self.max_sessions:      # forget the oldest, their tabs are long gone
+                self.evicted.popitem(last=False)
+            print(f"----- Session {handle[:8]} evicted -----")
+
+    @staticmethod
+    def _stop(session):
+        session['running'] = False      # the data source ends its current batch, flushing its store
+        session['closed'] = True        # and the dashboard pipeline its current step
+
+
+sessions = SessionRegistry()
+
+
 def show_toast(text):
     gr.Info(text, duration=1.5)
     return "Toast displayed"
 
 def play_fn(state):
-    state['running'] = True
+    session = sessions.get(state)
+    if session is None:
+        return state
+    session['running'] = True
     print("\n\n===== Production started =====")
     show_toast("Production started !")
     return state
 
 def stop_fn(state):
-    state['running'] = False
+    session = sessions.get(state)
+    if session is None:
+        return state
+    session['running'] = False
     print("----- Production stopped -----")
     show_toast("Production paused !")
     return  state
 
 def reset_fn(state):
-    state['running'] = False
-    state['current_time'] = None
-    state['part_id'] = None
-    state['data'] = {}
-    state['machine'] = {}
+    sessions.drop(state)
     print("----- Production rested -----\n\n")
     show_toast("Production reset !")
     return state
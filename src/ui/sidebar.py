@@ -53,13 +53,3 @@ def sidebar_ui(state, width=700, visible=True):
                             additional_inputs=[state],
                             cache_examples=False
                         )
-        sessions_state = gr.JSON(
-            label="Sessions State",
-            visible=False,
-            value=state.value,
-        )
-        state.change(
-            fn=lambda x: x,
-            inputs=state,
-            outputs=sessions_state,
-        )
\ No newline at end of file